@@ -60,8 +60,16 @@ page = st.sidebar.radio(
 # Filter section in sidebar
 st.sidebar.header("Filters")
 if not st.session_state.data.empty:
+    # Sorted filter options, recomputed only when the dataset is replaced
+    if st.session_state.get('filter_options_source') is not st.session_state.data:
+        st.session_state.filter_options_source = st.session_state.data
+        st.session_state.filter_options = {
+            'cities': np.unique(st.session_state.data['city'].dropna().to_numpy()).tolist(),
+            'property_types': np.unique(st.session_state.data['property_type'].dropna().to_numpy()).tolist()
+        }
+    
     # Location filter
-    available_cities = sorted(st.session_state.data['city'].unique())
+    available_cities = st.session_state.filter_options['cities']
     selected_cities = st.sidebar.multiselect(
         "Select Cities",
         options=available_cities,
@@ -79,7 +87,7 @@ if not st.session_state.data.empty:
     )
     
     # Property type filter
-    property_types = sorted(st.session_state.data['property_type'].unique())
+    property_types = st.session_state.filter_options['property_types']
     selected_property_types = st.sidebar.multiselect(
         "Property Type",
         options=property_types,
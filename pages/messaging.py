@@ -4,6 +4,8 @@ This page provides a unified interface for sending various types of real estate-
 through multiple communication channels.
 """
 
+import re
+import random
 import streamlit as st
 import pandas as pd
 from datetime import datetime
@@ -31,6 +33,41 @@ from utils.sms_service import (
 from utils.database import get_properties, get_leads
 from utils.image_generator import generate_email_header_image, image_to_base64
 
+# Maximum number of rows shown in the campaign recipient preview
+RECIPIENT_PREVIEW_LIMIT = 200
+
+# Recipient format checks applied before a campaign is dispatched
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+E164_RE = re.compile(r"^\+?\d{7,15}$")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_leads():
+    """Get leads, cached across reruns to avoid a database round-trip per widget interaction"""
+    return get_leads()
+
+def _validate_recipients(recipient_list, channel):
+    """Split recipients into those with a valid format for the channel and a count of invalid ones"""
+    raw = pd.Series(recipient_list, dtype=object)
+    recipients = raw.astype(str).str.strip()
+    if channel == "Email":
+        valid_mask = recipients.str.match(EMAIL_RE)
+    else:  # WhatsApp or SMS
+        # Ignore common separators so numbers like "+1 (555) 123-4567" still pass
+        valid_mask = recipients.str.replace(r"[\s\-().]", "", regex=True).str.match(E164_RE)
+    valid_mask = valid_mask.fillna(False).astype(bool)
+    return raw[valid_mask].tolist(), int((~valid_mask).sum())
+
+def _sample_market_data():
+    """Generate sample market data for campaign template variables"""
+    return {
+        "trend": random.choice(["positive growth", "steady performance", "slight correction"]),
+        "median_price": f"{random.randint(300000, 800000):,}",
+        "days_on_market": random.randint(10, 60),
+        "inventory": random.randint(20, 200),
+        "yoy_change": random.uniform(-5.0, 8.0),
+        "action_recommendation": random.choice(["consider buying", "hold your investment", "explore new neighborhoods"])
+    }
+
 def show_messaging():
     """Display messaging interface for multiple channels"""
     st.title("Messaging Center")
@@ -626,7 +663,7 @@ def show_campaign_messages_tab(available_channels):
     )
     
     # Get leads data for targeting
-    leads_df = get_leads()
+    leads_df = _cached_leads()
     
     if not leads_df.empty:
         st.subheader("Recipient Targeting")
@@ -669,7 +706,10 @@ def show_campaign_messages_tab(available_channels):
         
         if len(filtered_leads) > 0:
             with st.expander("View selected recipients"):
-                st.dataframe(filtered_leads[["name", "email", "phone", "lead_score", "status"]])
+                # Cap the preview so large recipient sets aren't serialized on every rerun
+                st.dataframe(filtered_leads[["name", "email", "phone", "lead_score", "status"]].head(RECIPIENT_PREVIEW_LIMIT))
+                if len(filtered_leads) > RECIPIENT_PREVIEW_LIMIT:
+                    st.caption(f"Showing first {RECIPIENT_PREVIEW_LIMIT} of {len(filtered_leads)}")
         
         recipient_list = []
         if channel == "Email":
@@ -763,6 +803,14 @@ Your Real Estate Team"""
             st.error("Please enter content for your campaign.")
             return
         
+        # Drop malformed recipients up front instead of paying for a failed API call each
+        recipient_list, invalid_count = _validate_recipients(recipient_list, channel)
+        if invalid_count:
+            st.warning(f"{invalid_count} recipients skipped (invalid format)")
+        if not recipient_list:
+            st.error("None of the selected recipients have a valid format for this channel.")
+            return
+        
         with st.spinner(f"{'Sending' if send_immediately else 'Scheduling'} campaign to {len(recipient_list)} recipients..."):
             if send_immediately:
                 # Send campaign immediately
@@ -775,18 +823,10 @@ Your Real Estate Team"""
                     
                     provider = providers[0]
                     
-                    # Create some random sample data for template variables
-                    import random
-                    sample_data = {
-                        "trend": random.choice(["positive growth", "steady performance", "slight correction"]),
-                        "median_price": f"{random.randint(300000, 800000):,}",
-                        "days_on_market": random.randint(10, 60),
-                        "inventory": random.randint(20, 200),
-                        "yoy_change": random.uniform(-5.0, 8.0),
-                        "action_recommendation": random.choice(["consider buying", "hold your investment", "explore new neighborhoods"])
-                    }
+                    # Create some random sample data for template variables, shared by all recipients
+                    sample_data = _sample_market_data()
                     
-                    success_count = 0
+                    results = []
                     for recipient in recipient_list:
                         # For demonstration, personalize with recipient's name if available
                         if not leads_df.empty:
@@ -811,12 +851,11 @@ Your Real Estate Team"""
                             text_content=personalized_content
                         )
                         
-                        if result.get("success"):
-                            success_count += 1
+                        results.append(result)
                 
                 elif channel == "WhatsApp":
                     # Example for WhatsApp campaign
-                    success_count = 0
+                    results = []
                     for recipient in recipient_list:
                         # For demonstration, personalize with recipient's name if available
                         if not leads_df.empty:
@@ -830,12 +869,11 @@ Your Real Estate Team"""
                         # Send WhatsApp message
                         result = send_whatsapp_message(recipient, personalized_content)
                         
-                        if result.get("success"):
-                            success_count += 1
+                        results.append(result)
                 
                 elif channel == "SMS":
                     # Example for SMS campaign
-                    success_count = 0
+                    results = []
                     for recipient in recipient_list:
                         # For demonstration, personalize with recipient's name if available
                         if not leads_df.empty:
@@ -852,15 +890,30 @@ Your Real Estate Team"""
                         
                         result = send_sms(recipient, personalized_content)
                         
-                        if result.get("success"):
-                            success_count += 1
+                        results.append(result)
+                
+                # Tally successes and collect errors in a single pass over the results
+                sent = [bool(result.get("success")) for result in results]
+                success_count = sum(sent)
+                error_messages = [
+                    f"{recipient}: {result.get('message', 'Unknown error')}"
+                    for recipient, result, ok in zip(recipient_list, results, sent) if not ok
+                ]
                 
                 if success_count == len(recipient_list):
                     st.success(f"Campaign sent successfully to all {len(recipient_list)} recipients!")
                 elif success_count > 0:
                     st.warning(f"Campaign sent to {success_count} out of {len(recipient_list)} recipients. Some messages failed.")
+                    if error_messages:
+                        with st.expander("View errors"):
+                            for err in error_messages:
+                                st.write(err)
                 else:
                     st.error("Failed to send campaign to any recipients.")
+                    if error_messages:
+                        with st.expander("View errors"):
+                            for err in error_messages:
+                                st.write(err)
             
             else:
                 # Just simulate scheduling
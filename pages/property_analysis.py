@@ -1,10 +1,212 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
 from utils.visualization import plot_price_vs_sqft, plot_price_distribution, plot_price_heatmap
 from utils.prediction import train_price_prediction_model, predict_property_price
 
+CURRENT_YEAR = 2025  # Hard-coded current year
+
+# Number of distinct filtered datasets whose models, charts and stats are kept in the cache
+CACHE_MAX_ENTRIES = 8
+
+# Larger filtered sets are downsampled before plotting the price vs. square footage scatter
+MAX_SCATTER_POINTS = 5000
+
+# Integer columns downcast to the narrowest dtype that holds their values
+NARROW_INT_COLUMNS = ['bedrooms', 'bathrooms', 'year_built', 'days_on_market', 'sqft']
+
+# Rows of the property comparison table and the columns they are read from
+COMPARISON_FEATURES = {
+    'Price': 'price',
+    'Price/Sqft': 'price_per_sqft',
+    'Bedrooms': 'bedrooms',
+    'Bathrooms': 'bathrooms',
+    'Square Footage': 'sqft',
+    'Year Built': 'year_built',
+    'Days on Market': 'days_on_market',
+    'Property Type': 'property_type',
+    'City': 'city'
+}
+
+# Display formats for the numeric rows of the comparison table
+COMPARISON_FORMATS = {
+    'Price': '${:,.0f}',
+    'Price/Sqft': '${:,.2f}',
+    'Bedrooms': '{:.0f}',
+    'Bathrooms': '{:g}',
+    'Square Footage': '{:,.0f}',
+    'Year Built': '{:.0f}',
+    'Days on Market': '{:.0f}'
+}
+
+# Columns used by the model and charts, hashed to detect when the filtered data changes
+FINGERPRINT_COLUMNS = ['property_id', 'address', 'city', 'property_type', 'bedrooms', 'bathrooms',
+                       'sqft', 'year_built', 'price', 'days_on_market']
+
+def _data_fingerprint(df):
+    """Cheap (row count, columns, content hash) fingerprint of the filtered data used as a cache key across reruns"""
+    columns = [col for col in FINGERPRINT_COLUMNS if col in df.columns]
+    return (len(df), tuple(df.columns), int(pd.util.hash_pandas_object(df[columns], index=False).sum()))
+
+def _prepare_data(df):
+    """Convert the columns used on this page to compact dtypes and add derived columns"""
+    # Categorical city/type columns give pre-sorted, NaN-free dropdown options and cheaper comparisons
+    prepared = {
+        'city': df['city'].astype('category').cat.remove_unused_categories(),
+        'property_type': df['property_type'].astype('category').cat.remove_unused_categories()
+    }
+    # Arrow-backed strings keep addresses in contiguous buffers instead of Python objects
+    if 'address' in df.columns:
+        prepared['address'] = df['address'].astype('string[pyarrow]')
+    # Narrow integer columns so masks, groupbys and aggregations scan less memory;
+    # columns holding NaN stay float since they can't be cast to an integer dtype
+    for col in NARROW_INT_COLUMNS:
+        if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
+            prepared[col] = pd.to_numeric(df[col], downcast='integer')
+    # Price per square foot, left as NaN where square footage is missing or not positive
+    prepared['price_per_sqft'] = df['price'] / df['sqft'].where(df['sqft'] > 0)
+    return df.assign(**prepared)
+
+@st.cache_resource(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _get_model(data_hash, _df):
+    """Train the price prediction model once per distinct filtered dataset"""
+    return train_price_prediction_model(_df)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _cached_price_distribution(data_hash, _df):
+    """Build the price distribution chart once per distinct filtered dataset"""
+    return plot_price_distribution(_df)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _cached_price_vs_sqft(data_hash, _df):
+    """Build the price vs. square footage chart once per distinct filtered dataset"""
+    plot_df = _df
+    if len(_df) > MAX_SCATTER_POINTS:
+        # Stratify by price decile so the sample keeps the shape of the full distribution
+        price_deciles = pd.qcut(_df['price'], 10, duplicates='drop')
+        plot_df = _df.groupby(price_deciles, observed=True).sample(
+            frac=MAX_SCATTER_POINTS / len(_df), random_state=0
+        )
+    return plot_price_vs_sqft(plot_df)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _cached_price_heatmap(data_hash, _df):
+    """Build the bedroom/bathroom price heatmap once per distinct filtered dataset"""
+    return plot_price_heatmap(_df)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _city_price_stats(data_hash, _df):
+    """Price mean, median, standard deviation and count per city, computed in a single groupby pass"""
+    return _df.groupby('city', observed=True)['price'].agg(['mean', 'median', 'std', 'count']).to_dict('index')
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _form_bounds(data_hash, _df):
+    """
+    Options and bounds for every predictor input, computed once per filtered dataset
+    
+    Numeric bounds come from a single aggregation and are None when a column has no valid values.
+    """
+    inputs = pd.DataFrame({
+        'bedrooms': _df['bedrooms'],
+        'bathrooms': _df['bathrooms'],
+        'sqft': _df['sqft'].where(_df['sqft'] > 0),
+        'year_built': _df['year_built'].where(_df['year_built'] <= CURRENT_YEAR)
+    })
+    stats = inputs.agg(['min', 'max', 'count'])
+    bounds = {
+        col: (stats.at['min', col], stats.at['max', col]) if stats.at['count', col] > 0 else None
+        for col in stats.columns
+    }
+    # Categories are already sorted and exclude NaN
+    bounds['cities'] = _df['city'].cat.categories.tolist()
+    bounds['property_types'] = _df['property_type'].cat.categories.tolist()
+    return bounds
+
+@st.cache_resource(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _comparison_index(data_hash, _df):
+    """Index properties by ID and format their selectbox labels so comparison lookups are hash lookups"""
+    by_id = _df.drop_duplicates('property_id').set_index('property_id')
+    labels = {pid: f"ID: {pid} - {address}" for pid, address in by_id['address'].items()}
+    return by_id, labels
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _decade_stats(data_hash, _df):
+    """Average price and property count per decade built, grouped on an int16 key without copying the data"""
+    # Ensure year_built is numeric and drop missing values in one pass
+    year_built = pd.to_numeric(_df['year_built'], errors='coerce').dropna()
+    decade = (year_built.astype(np.int16) // 10 * 10).rename('decade')
+    return _df['price'].loc[year_built.index].groupby(decade, sort=True).agg(['mean', 'count']).reset_index()
+
+def _find_similar_properties(df, city, property_type, bedrooms, bathrooms, sqft):
+    """
+    Find properties similar to the given details in a single pass over the data
+    
+    The strict, relaxed and city/bedrooms-only criteria are nested, so each row is scored by
+    how many of them it meets and only the rows in the best tier reached are returned.
+    """
+    city_match = df['city'].cat.codes.to_numpy() == df['city'].cat.categories.get_loc(city)
+    type_match = df['property_type'].cat.codes.to_numpy() == df['property_type'].cat.categories.get_loc(property_type)
+    beds = df['bedrooms'].to_numpy()
+    sqft_values = df['sqft'].to_numpy()
+    
+    # Narrow each mask in place so every tier costs one buffer rather than a temporary per predicate
+    near_beds = city_match
+    near_beds &= np.abs(beds - bedrooms) <= 1
+    relaxed = near_beds & type_match
+    relaxed &= sqft_values >= sqft * 0.7
+    relaxed &= sqft_values <= sqft * 1.3
+    strict = relaxed & (beds == bedrooms)
+    strict &= df['bathrooms'].to_numpy() == bathrooms
+    strict &= sqft_values >= sqft * 0.8
+    strict &= sqft_values <= sqft * 1.2
+    
+    tier = near_beds.astype(np.int8)
+    tier += relaxed
+    tier += strict
+    best_tier = tier.max() if len(tier) else 0
+    if best_tier == 0:
+        return df.iloc[0:0]
+    return df[tier == best_tier]
+
+def _build_comparison(by_id, property1, property2):
+    """
+    Build the comparison table and price metrics for two properties
+    
+    Returns None when either property is missing a valid price or square footage.
+    """
+    # Read both rows in one lookup as a 2 x k array instead of materializing a Series per property
+    columns = list(COMPARISON_FEATURES.values())
+    rows = by_id.loc[[property1, property2], columns].to_numpy()
+    price = rows[:, columns.index('price')].astype(float)
+    sqft = rows[:, columns.index('sqft')].astype(float)
+    price_per_sqft = rows[:, columns.index('price_per_sqft')].astype(float)
+    
+    # Ensure all required numeric fields are available and valid
+    if not (pd.notna(price).all() and pd.notna(sqft).all() and (sqft > 0).all()):
+        return None
+    
+    # Create comparison table with numeric cells; formatting is applied per feature row by the Styler
+    comparison_df = pd.DataFrame(
+        rows.T,
+        index=pd.Index(list(COMPARISON_FEATURES), name='Feature'),
+        columns=['Property 1', 'Property 2']
+    )
+    comparison_table = comparison_df.style
+    for feature, fmt in COMPARISON_FORMATS.items():
+        comparison_table = comparison_table.format(fmt, subset=pd.IndexSlice[[feature], :], na_rep='N/A')
+    
+    price_diff = price[0] - price[1]
+    metrics = {
+        'price_diff': price_diff,
+        'price_diff_pct': (price_diff / price[1]) * 100,
+        'price_per_sqft1': price_per_sqft[0],
+        'price_per_sqft2': price_per_sqft[1]
+    }
+    
+    return comparison_table, metrics
+
 def show_property_analysis(filtered_data):
     st.title("Property Analysis")
     
@@ -13,23 +215,28 @@ def show_property_analysis(filtered_data):
     Use the filters in the sidebar to customize the data view.
     """)
     
-    if filtered_data.empty:
+    # Bail out before any data preparation or figure construction when nothing matches the filters
+    if len(filtered_data) == 0:
         st.warning("No data available with the current filters. Please adjust your selection.")
         return
     
+    filtered_data = _prepare_data(filtered_data)
+    
+    data_hash = _data_fingerprint(filtered_data)
+    
     # Property distribution by type and price
     st.subheader("Property Price Distribution")
-    price_dist_fig = plot_price_distribution(filtered_data)
+    price_dist_fig = _cached_price_distribution(data_hash, filtered_data)
     st.plotly_chart(price_dist_fig, use_container_width=True)
     
     # Price vs Square Footage analysis
     st.subheader("Price vs. Square Footage Analysis")
-    price_sqft_fig = plot_price_vs_sqft(filtered_data)
+    price_sqft_fig = _cached_price_vs_sqft(data_hash, filtered_data)
     st.plotly_chart(price_sqft_fig, use_container_width=True)
     
     # Price by bedrooms and bathrooms
     st.subheader("Price by Bedrooms and Bathrooms")
-    heatmap_fig = plot_price_heatmap(filtered_data)
+    heatmap_fig = _cached_price_heatmap(data_hash, filtered_data)
     st.plotly_chart(heatmap_fig, use_container_width=True)
     
     # Year built analysis
@@ -38,51 +245,27 @@ def show_property_analysis(filtered_data):
     # Check if we have the year_built data
     if 'year_built' in filtered_data.columns and not filtered_data['year_built'].isna().all():
         try:
-            # Drop rows with missing year_built
-            year_data = filtered_data.dropna(subset=['year_built']).copy()
+            decade_data = _decade_stats(data_hash, filtered_data)
             
-            if not year_data.empty:
-                # Group by decade - ensure year_built is numeric
-                year_data['year_built'] = pd.to_numeric(year_data['year_built'], errors='coerce')
-                year_data = year_data.dropna(subset=['year_built'])
-                
-                # Only proceed if we still have data
-                if not year_data.empty:
-                    year_data['decade'] = (year_data['year_built'] // 10) * 10
-                    decade_data = year_data.groupby('decade')['price'].agg(['mean', 'count']).reset_index()
-                    decade_data = decade_data.sort_values('decade')
-                    
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        # Price by decade
-                        fig = px.bar(
-                            decade_data,
-                            x='decade',
-                            y='mean',
-                            title='Average Price by Decade Built',
-                            labels={'decade': 'Decade Built', 'mean': 'Average Price ($)'},
-                            template='plotly_white',
-                            text_auto='.2s'
-                        )
-                        
-                        fig.update_layout(yaxis_tickprefix='$', yaxis_tickformat=',')
-                        st.plotly_chart(fig, use_container_width=True)
-                    
-                    with col2:
-                        # Count by decade
-                        fig = px.bar(
-                            decade_data,
-                            x='decade',
-                            y='count',
-                            title='Number of Properties by Decade Built',
-                            labels={'decade': 'Decade Built', 'count': 'Number of Properties'},
-                            template='plotly_white',
-                            text_auto=True
-                        )
-                        st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.warning("Not enough valid year data to analyze property age distribution.")
+            if not decade_data.empty:
+                # Price and property count by decade in a single two-panel figure
+                fig = make_subplots(
+                    rows=1, cols=2,
+                    subplot_titles=('Average Price by Decade Built', 'Number of Properties by Decade Built')
+                )
+                fig.add_trace(
+                    go.Bar(x=decade_data['decade'], y=decade_data['mean'], texttemplate='%{y:.2s}', name='Average Price ($)'),
+                    row=1, col=1
+                )
+                fig.add_trace(
+                    go.Bar(x=decade_data['decade'], y=decade_data['count'], texttemplate='%{y}', name='Number of Properties'),
+                    row=1, col=2
+                )
+                fig.update_xaxes(title_text='Decade Built')
+                fig.update_yaxes(title_text='Average Price ($)', tickprefix='$', tickformat=',', row=1, col=1)
+                fig.update_yaxes(title_text='Number of Properties', row=1, col=2)
+                fig.update_layout(template='plotly_white', showlegend=False)
+                st.plotly_chart(fig, use_container_width=True)
             else:
                 st.warning("No valid year built data available for analysis.")
         except Exception as e:
@@ -90,6 +273,13 @@ def show_property_analysis(filtered_data):
     else:
         st.warning("Year built data not available for the current selection.")
     
+    # The predictor and comparison tool are fragments, so their widgets rerun only their own section
+    _show_price_predictor(filtered_data, data_hash)
+    _show_property_comparison(filtered_data, data_hash)
+
+@st.fragment
+def _show_price_predictor(filtered_data, data_hash):
+    """Display the price predictor form and its results"""
     # Property price prediction
     st.header("Property Price Predictor")
     
@@ -98,8 +288,16 @@ def show_property_analysis(filtered_data):
     Our AI model analyzes local market data to generate price estimates.
     """)
     
-    # Train the prediction model
-    model, preprocessor, features, mae, r2 = train_price_prediction_model(filtered_data)
+    # Only train once the user asks for it, so visits that just view the charts skip the fit
+    train_requested = st.session_state.get('price_model_requested', False) or st.button("Train Price Model")
+    
+    if train_requested:
+        st.session_state.price_model_requested = True
+        # Train the prediction model (cached, so widget reruns don't retrain it)
+        model, preprocessor, features, mae, r2 = _get_model(data_hash, filtered_data)
+    else:
+        model = None
+        st.info("Click **Train Price Model** to build a price model from the filtered data.")
     
     if model is not None:
         # Display model metrics
@@ -109,6 +307,9 @@ def show_property_analysis(filtered_data):
         - R² Score: {r2:.2f}
         """)
         
+        # Input bounds for the form widgets
+        bounds = _form_bounds(data_hash, filtered_data)
+        
         # Create form for user input
         with st.form("property_prediction_form"):
             st.subheader("Enter Property Details")
@@ -118,9 +319,7 @@ def show_property_analysis(filtered_data):
             with col1:
                 try:
                     # Get available cities
-                    available_cities = sorted(filtered_data['city'].unique().tolist())
-                    # Remove any NaN values
-                    available_cities = [city for city in available_cities if isinstance(city, str) or not pd.isna(city)]
+                    available_cities = bounds['cities']
                     if available_cities:
                         city = st.selectbox("City", options=available_cities)
                     else:
@@ -128,9 +327,7 @@ def show_property_analysis(filtered_data):
                         return
                     
                     # Get available property types
-                    property_types = sorted(filtered_data['property_type'].unique().tolist())
-                    # Remove any NaN values
-                    property_types = [pt for pt in property_types if isinstance(pt, str) or not pd.isna(pt)]
+                    property_types = bounds['property_types']
                     if property_types:
                         property_type = st.selectbox("Property Type", options=property_types)
                     else:
@@ -142,22 +339,20 @@ def show_property_analysis(filtered_data):
             
             with col2:
                 try:
-                    # Get valid bedroom values (filter out NaN and invalid)
-                    bed_values = filtered_data['bedrooms'].dropna()
-                    if len(bed_values) > 0:
-                        min_beds = max(1, int(bed_values.min()))
-                        max_beds = min(10, int(bed_values.max()))  # Limit to reasonable values
+                    # Get valid bedroom bounds (NaN excluded)
+                    if bounds['bedrooms'] is not None:
+                        min_beds = max(1, int(bounds['bedrooms'][0]))
+                        max_beds = min(10, int(bounds['bedrooms'][1]))  # Limit to reasonable values
                         default_beds = min(3, max_beds)  # Default value capped at 3 or max available
                         bedrooms = st.number_input("Bedrooms", min_value=min_beds, max_value=max_beds, value=default_beds)
                     else:
                         st.error("No valid bedroom data available.")
                         return
                     
-                    # Get valid bathroom values (filter out NaN and invalid)
-                    bath_values = filtered_data['bathrooms'].dropna()
-                    if len(bath_values) > 0:
-                        min_baths = max(1, int(bath_values.min()))
-                        max_baths = min(10, int(bath_values.max()))  # Limit to reasonable values
+                    # Get valid bathroom bounds (NaN excluded)
+                    if bounds['bathrooms'] is not None:
+                        min_baths = max(1, int(bounds['bathrooms'][0]))
+                        max_baths = min(10, int(bounds['bathrooms'][1]))  # Limit to reasonable values
                         default_baths = min(2, max_baths)  # Default value capped at 2 or max available
                         bathrooms = st.number_input("Bathrooms", min_value=min_baths, max_value=max_baths, value=default_baths)
                     else:
@@ -171,11 +366,10 @@ def show_property_analysis(filtered_data):
             
             with col1:
                 try:
-                    # Get valid square footage values (filter out NaN, zero, and negative)
-                    sqft_values = filtered_data['sqft'][filtered_data['sqft'] > 0].dropna()
-                    if len(sqft_values) > 0:
-                        min_sqft = max(100, int(sqft_values.min()))
-                        max_sqft = min(10000, int(sqft_values.max()))  # Limit to reasonable values
+                    # Get valid square footage bounds (NaN, zero, and negative excluded)
+                    if bounds['sqft'] is not None:
+                        min_sqft = max(100, int(bounds['sqft'][0]))
+                        max_sqft = min(10000, int(bounds['sqft'][1]))  # Limit to reasonable values
                         default_sqft = min(2000, max_sqft)  # Default value capped at 2000 or max available
                         sqft = st.number_input("Square Footage", min_value=min_sqft, max_value=max_sqft, value=default_sqft)
                     else:
@@ -187,12 +381,10 @@ def show_property_analysis(filtered_data):
             
             with col2:
                 try:
-                    # Get valid year built values (filter out NaN and future years)
-                    current_year = 2025  # Hard-coded current year
-                    year_values = filtered_data['year_built'][filtered_data['year_built'] <= current_year].dropna()
-                    if len(year_values) > 0:
-                        min_year = max(1900, int(year_values.min()))  # Limit to reasonable values
-                        max_year = min(current_year, int(year_values.max()))
+                    # Get valid year built bounds (NaN and future years excluded)
+                    if bounds['year_built'] is not None:
+                        min_year = max(1900, int(bounds['year_built'][0]))  # Limit to reasonable values
+                        max_year = min(CURRENT_YEAR, int(bounds['year_built'][1]))
                         default_year = min(2000, max_year)  # Default value capped at 2000 or max available
                         year_built = st.number_input("Year Built", min_value=min_year, max_value=max_year, value=default_year)
                     else:
@@ -226,30 +418,7 @@ def show_property_analysis(filtered_data):
                 
                 try:
                     # Filter similar properties with relaxed criteria to ensure we find some matches
-                    # Start with strict criteria
-                    similar = filtered_data[
-                        (filtered_data['city'] == city) &
-                        (filtered_data['property_type'] == property_type) &
-                        (filtered_data['bedrooms'] == bedrooms) &
-                        (filtered_data['bathrooms'] == bathrooms) &
-                        (filtered_data['sqft'].between(sqft * 0.8, sqft * 1.2))
-                    ]
-                    
-                    # If we don't find any properties, relax the criteria
-                    if similar.empty:
-                        similar = filtered_data[
-                            (filtered_data['city'] == city) &
-                            (filtered_data['property_type'] == property_type) &
-                            (filtered_data['bedrooms'].between(bedrooms-1, bedrooms+1)) &
-                            (filtered_data['sqft'].between(sqft * 0.7, sqft * 1.3))
-                        ]
-                    
-                    # If we still don't find any, further relax criteria
-                    if similar.empty:
-                        similar = filtered_data[
-                            (filtered_data['city'] == city) &
-                            (filtered_data['bedrooms'].between(bedrooms-1, bedrooms+1))
-                        ]
+                    similar = _find_similar_properties(filtered_data, city, property_type, bedrooms, bathrooms, sqft)
                     
                     # Display properties if we found any
                     if not similar.empty:
@@ -260,32 +429,23 @@ def show_property_analysis(filtered_data):
                                 display_columns.append(col)
                         
                         if display_columns:
-                            st.dataframe(
-                                similar[display_columns]
-                                .sort_values(by='price')
-                                .head(5)
-                            )
+                            st.dataframe(similar[display_columns].nsmallest(5, 'price'))
                         else:
                             st.info("Found similar properties but couldn't display details due to missing columns.")
                     else:
                         st.info("No similar properties found in the database.")
                     
                     # Price comparison
-                    city_properties = filtered_data[filtered_data['city'] == city]
-                    if not city_properties.empty and 'price' in city_properties.columns:
-                        city_prices = city_properties['price'].dropna()
-                        if len(city_prices) > 0:
-                            city_avg = city_prices.mean()
-                            price_diff = predicted_price - city_avg
-                            price_diff_pct = (price_diff / city_avg) * 100
-                            
-                            # Market positioning
-                            if price_diff > 0:
-                                st.info(f"This property is **${price_diff:,.0f} ({price_diff_pct:.1f}%)** above the average price in {city}.")
-                            else:
-                                st.info(f"This property is **${abs(price_diff):,.0f} ({abs(price_diff_pct):.1f}%)** below the average price in {city}.")
+                    city_avg = _city_price_stats(data_hash, filtered_data).get(city, {}).get('mean')
+                    if city_avg is not None and not pd.isna(city_avg):
+                        price_diff = predicted_price - city_avg
+                        price_diff_pct = (price_diff / city_avg) * 100
+                        
+                        # Market positioning
+                        if price_diff > 0:
+                            st.info(f"This property is **${price_diff:,.0f} ({price_diff_pct:.1f}%)** above the average price in {city}.")
                         else:
-                            st.info(f"No price data available for {city} to make a comparison.")
+                            st.info(f"This property is **${abs(price_diff):,.0f} ({abs(price_diff_pct):.1f}%)** below the average price in {city}.")
                     else:
                         st.info(f"No price data available for {city} to make a comparison.")
                     
@@ -293,9 +453,12 @@ def show_property_analysis(filtered_data):
                     st.warning(f"Error finding similar properties: {str(e)}")
             else:
                 st.error("Unable to generate prediction. Please check your inputs.")
-    else:
+    elif train_requested:
         st.warning("Not enough data available to build a reliable prediction model. Please adjust your filters.")
-    
+
+@st.fragment
+def _show_property_comparison(filtered_data, data_hash):
+    """Display the side-by-side property comparison tool"""
     # Property comparison tool
     st.header("Property Comparison Tool")
     
@@ -307,90 +470,69 @@ def show_property_analysis(filtered_data):
     required_comparison_columns = ['property_id', 'address', 'price', 'sqft', 'bedrooms', 'bathrooms', 
                                  'year_built', 'days_on_market', 'property_type', 'city']
     
-    if (not filtered_data.empty and len(filtered_data) >= 2 and 
+    num_rows = len(filtered_data)
+    if (num_rows >= 2 and
         all(col in filtered_data.columns for col in required_comparison_columns)):
         
         try:
+            # Properties indexed by ID and the selectbox labels, built once per dataset
+            by_id, labels = _comparison_index(data_hash, filtered_data)
+            
             # Get property IDs
-            property_ids = filtered_data['property_id'].unique()
+            property_ids = by_id.index
             
             # Make sure we have valid address data
-            valid_addresses = True
-            for pid in property_ids:
-                address_values = filtered_data[filtered_data['property_id'] == pid]['address'].values
-                if len(address_values) == 0 or pd.isna(address_values[0]):
-                    valid_addresses = False
-                    break
+            valid_addresses = not by_id['address'].isna().any()
             
             if valid_addresses:
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    property1 = st.selectbox(
-                        "Select First Property",
-                        options=property_ids,
-                        format_func=lambda x: f"ID: {x} - {filtered_data[filtered_data['property_id'] == x]['address'].values[0]}"
-                    )
-                
-                with col2:
-                    # Filter out the first property
-                    remaining_ids = [pid for pid in property_ids if pid != property1]
-                    property2 = st.selectbox(
-                        "Select Second Property",
-                        options=remaining_ids,
-                        format_func=lambda x: f"ID: {x} - {filtered_data[filtered_data['property_id'] == x]['address'].values[0]}"
-                    )
+                # Collect both selections in a form so picking a pair costs a single rerun
+                with st.form("property_comparison_form"):
+                    col1, col2 = st.columns(2)
+                    
+                    with col1:
+                        property1 = st.selectbox(
+                            "Select First Property",
+                            options=property_ids,
+                            format_func=labels.get
+                        )
+                    
+                    with col2:
+                        # Default to a different property than the first one
+                        property2 = st.selectbox(
+                            "Select Second Property",
+                            options=property_ids,
+                            index=min(1, len(property_ids) - 1),
+                            format_func=labels.get
+                        )
+                    
+                    compare_button = st.form_submit_button("Compare Properties")
                 
-                # Get property data
-                prop1_data = filtered_data[filtered_data['property_id'] == property1]
-                prop2_data = filtered_data[filtered_data['property_id'] == property2]
+                # Compare the last submitted pair, falling back to the current selection
+                selected = st.session_state.get('property_comparison')
+                if compare_button or selected is None or not all(pid in by_id.index for pid in selected):
+                    selected = (property1, property2)
+                    st.session_state.property_comparison = selected
+                property1, property2 = selected
                 
-                if not prop1_data.empty and not prop2_data.empty:
-                    prop1_data = prop1_data.iloc[0]
-                    prop2_data = prop2_data.iloc[0]
+                if property1 == property2:
+                    st.warning("Please select two different properties to compare.")
+                elif property1 in by_id.index and property2 in by_id.index:
+                    # Reuse the comparison built for this pair on earlier reruns
+                    comparison_key = (data_hash, property1, property2)
+                    if st.session_state.get('property_comparison_key') != comparison_key:
+                        st.session_state.property_comparison_key = comparison_key
+                        st.session_state.property_comparison_result = _build_comparison(by_id, property1, property2)
+                    comparison = st.session_state.property_comparison_result
                     
-                    # Ensure all required numeric fields are available and valid
-                    if (all(field in prop1_data and field in prop2_data for field in ['price', 'sqft']) and
-                        not pd.isna(prop1_data['price']) and not pd.isna(prop1_data['sqft']) and
-                        not pd.isna(prop2_data['price']) and not pd.isna(prop2_data['sqft']) and
-                        prop1_data['sqft'] > 0 and prop2_data['sqft'] > 0):
-                        
-                        # Create comparison table
-                        comparison_data = {
-                            'Feature': ['Price', 'Price/Sqft', 'Bedrooms', 'Bathrooms', 'Square Footage', 
-                                        'Year Built', 'Days on Market', 'Property Type', 'City'],
-                            'Property 1': [
-                                f"${prop1_data['price']:,.0f}",
-                                f"${prop1_data['price']/prop1_data['sqft']:.2f}",
-                                prop1_data['bedrooms'],
-                                prop1_data['bathrooms'],
-                                f"{prop1_data['sqft']:,}",
-                                prop1_data['year_built'],
-                                prop1_data['days_on_market'],
-                                prop1_data['property_type'],
-                                prop1_data['city']
-                            ],
-                            'Property 2': [
-                                f"${prop2_data['price']:,.0f}",
-                                f"${prop2_data['price']/prop2_data['sqft']:.2f}",
-                                prop2_data['bedrooms'],
-                                prop2_data['bathrooms'],
-                                f"{prop2_data['sqft']:,}",
-                                prop2_data['year_built'],
-                                prop2_data['days_on_market'],
-                                prop2_data['property_type'],
-                                prop2_data['city']
-                            ]
-                        }
-                        
-                        comparison_df = pd.DataFrame(comparison_data)
+                    if comparison is not None:
+                        comparison_table, metrics = comparison
                         
                         # Display comparison
-                        st.table(comparison_df)
+                        st.dataframe(comparison_table, use_container_width=True)
                         
-                        # Calculate and display difference
-                        price_diff = prop1_data['price'] - prop2_data['price']
-                        price_diff_pct = (price_diff / prop2_data['price']) * 100
+                        # Display difference
+                        price_diff = metrics['price_diff']
+                        price_diff_pct = metrics['price_diff_pct']
                         
                         if price_diff > 0:
                             st.info(f"Property 1 is **${price_diff:,.0f} ({price_diff_pct:.1f}%)** more expensive than Property 2.")
@@ -398,8 +540,8 @@ def show_property_analysis(filtered_data):
                             st.info(f"Property 1 is **${abs(price_diff):,.0f} ({abs(price_diff_pct):.1f}%)** less expensive than Property 2.")
                         
                         # Value analysis
-                        price_per_sqft1 = prop1_data['price'] / prop1_data['sqft']
-                        price_per_sqft2 = prop2_data['price'] / prop2_data['sqft']
+                        price_per_sqft1 = metrics['price_per_sqft1']
+                        price_per_sqft2 = metrics['price_per_sqft2']
                         
                         if price_per_sqft1 < price_per_sqft2:
                             st.success(f"Property 1 has better value in terms of price per square foot (${price_per_sqft1:.2f} vs ${price_per_sqft2:.2f}).")
@@ -2,9 +2,263 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
-import random
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics.pairwise import cosine_similarity
+import plotly.graph_objects as go
+
+# Seed for the simulated neighborhood and investment data, so the same inputs always simulate the same values
+SIMULATION_SEED = 42
+
+# Number of distinct inputs whose simulated neighborhood and investment data are kept in the cache
+CACHE_MAX_ENTRIES = 8
+
+# Neighborhood characteristic scores (0-10) simulated for each city
+NEIGHBORHOOD_SCORE_COLUMNS = ['dining_score', 'shopping_score', 'outdoor_score', 'arts_score',
+                              'quiet_score', 'family_score', 'school_score', 'safety_score']
+
+# Integer columns downcast to the narrowest dtype that holds their values
+NARROW_INT_COLUMNS = ['price', 'sqft', 'bedrooms', 'bathrooms', 'year_built', 'days_on_market']
+
+# Numerical features compared against the preferred values in preference matching
+MATCH_FEATURES = ['price', 'sqft', 'bedrooms', 'bathrooms', 'year_built']
+
+# Weights applied to the cash flow, cap rate and appreciation scores for each investment strategy
+INVESTMENT_STRATEGY_WEIGHTS = {
+    "Cash Flow (Rental Income)": [0.6, 0.3, 0.1],
+    "Appreciation (Long-term Growth)": [0.2, 0.2, 0.6],
+    "Balanced Approach": [0.33, 0.33, 0.34]
+}
+
+def _frame_fingerprint(df):
+    """Content hash used as the cache key for DataFrame arguments, skipping the unhashable price history lists"""
+    hashable = df.drop(columns='historical_prices', errors='ignore')
+    return (tuple(df.columns), int(pd.util.hash_pandas_object(hashable).sum()))
+
+def _prepare_data(data):
+    """Copy of the loaded data with categorical city/type and downcast integer columns, built once per dataset"""
+    prepared = st.session_state.get('property_matching_data')
+    if prepared is None or prepared['source'] is not data:
+        columns = {
+            'city': data['city'].astype('category'),
+            'property_type': data['property_type'].astype('category')
+        }
+        # Narrow integer columns so filter and score passes read less memory;
+        # columns holding NaN or fractional values keep their dtype
+        for col in NARROW_INT_COLUMNS:
+            if col in data.columns and pd.api.types.is_numeric_dtype(data[col]):
+                columns[col] = pd.to_numeric(data[col], downcast='integer')
+        # The price history lists aren't used here and would only slow down copying cached results
+        prepared = {'source': data, 'data': data.assign(**columns).drop(columns='historical_prices', errors='ignore')}
+        st.session_state.property_matching_data = prepared
+    return prepared['data']
+
+def _matching_stats(data):
+    """Sorted form options and numeric bounds for the matching tabs, computed once per loaded dataset"""
+    stats = st.session_state.get('property_matching_stats')
+    if stats is None or stats['source'] is not data:
+        bounds = data[['price', 'bedrooms', 'bathrooms', 'sqft', 'year_built']].agg(['min', 'max'])
+        stats = {
+            'source': data,
+            # Categories are already sorted and exclude NaN
+            'cities': data['city'].cat.categories.tolist(),
+            'property_types': data['property_type'].cat.categories.tolist()
+        }
+        for col in bounds.columns:
+            stats[col] = (int(bounds.at['min', col]), int(bounds.at['max', col]))
+        # Content fingerprint keying the cached match computations, so they never hash the data itself
+        stats['key'] = _frame_fingerprint(data)
+        # Contiguous float32 matrix of the numerical match features, sliced by the filter mask on each search
+        stats['features'] = np.ascontiguousarray(data[MATCH_FEATURES].to_numpy(dtype=np.float32))
+        st.session_state.property_matching_stats = stats
+    return stats
+
+def _neighborhood_lookup(data, neighborhood_data):
+    """
+    Neighborhood data as a NumPy block plus the block row of each property's city, built once per dataset
+    
+    Cities without neighborhood data map to a trailing row of NaN, matching a left join.
+    """
+    lookup = st.session_state.get('neighborhood_lookup')
+    if lookup is None or lookup['data'] is not data or lookup['neighborhood_data'] is not neighborhood_data:
+        columns = neighborhood_data.columns.drop('city')
+        # Scores and commute times are small numbers, so float32 is ample and halves the gathered columns
+        block = neighborhood_data[columns].to_numpy(dtype=np.float32)
+        lookup = {
+            'data': data,
+            'neighborhood_data': neighborhood_data,
+            'columns': columns,
+            'block': np.vstack([block, np.full(len(columns), np.nan, dtype=np.float32)]),
+            # Code -1 (unknown city) selects the trailing NaN row
+            'codes': pd.Categorical(data['city'], categories=neighborhood_data['city']).codes
+        }
+        st.session_state.neighborhood_lookup = lookup
+    return lookup['columns'], lookup['block'], lookup['codes']
+
+def _basic_filter_mask(data, ranges, selected_cities, selected_property_types):
+    """
+    Boolean mask of the rows meeting the basic search criteria, narrowed in place one criterion at a time
+    
+    Each range is a (low, high) pair of inclusive bounds where high may be None.
+    Empty city or property type selections don't filter.
+    """
+    mask = np.ones(len(data), dtype=bool)
+    for col, (low, high) in ranges.items():
+        values = data[col].to_numpy()
+        mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+    if selected_cities:
+        mask &= data['city'].isin(selected_cities).to_numpy()
+    if selected_property_types:
+        mask &= data['property_type'].isin(selected_property_types).to_numpy()
+    return mask
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _cached_match_scores(data_key, filters, _filtered_data, _features, preference, feature_weights,
+                         selected_cities, selected_property_types):
+    """Preference match scores for the filtered data, cached on the dataset key and the form inputs"""
+    return calculate_match_scores(_filtered_data, _features, preference, feature_weights,
+                                  selected_cities, selected_property_types)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _cached_lifestyle_scores(data_key, _data, _lookup, lifestyle_weights, work_location, max_commute):
+    """Lifestyle match scores, cached on the dataset key and the form inputs"""
+    columns, neighborhood_block, city_codes = _lookup
+    
+    # Gather each property's neighborhood scores and commute time by city code instead of joining on city names
+    commute_column = f'commute_to_{work_location}'
+    gather_columns = NEIGHBORHOOD_SCORE_COLUMNS + ([commute_column] if commute_column in columns else [])
+    neighborhood_values = neighborhood_block[np.ix_(city_codes, columns.get_indexer(gather_columns))]
+    merged_data = _data.assign(**dict(zip(gather_columns, neighborhood_values.T)))
+    
+    # No commute when working from home
+    if commute_column in columns:
+        merged_data = merged_data.rename(columns={commute_column: 'commute_time'})
+    else:
+        merged_data['commute_time'] = 0
+    
+    merged_data['lifestyle_score'] = calculate_lifestyle_scores(merged_data, lifestyle_weights, work_location, max_commute)
+    return merged_data
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _cached_investment_metrics(data_key, filters, selected_cities, selected_property_types,
+                               _filtered_data, down_payment_pct, holding_period):
+    """Simulated investment metrics for the filtered data, cached on the dataset key and the form inputs"""
+    return generate_investment_metrics(_filtered_data, down_payment_pct, holding_period)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, hash_funcs={pd.DataFrame: _frame_fingerprint})
+def _return_comparison_chart(comparison_data, investment_horizon):
+    """Grouped bar chart of the return metrics, cached so reruns with the same top properties reuse the figure"""
+    # Simplify address for display
+    comparison_data = comparison_data.assign(property=(
+        comparison_data['address'].str.split(' ', n=1).str[0] + ' ' + comparison_data['city'].astype(str)
+    ))
+    
+    # Create a grouped bar chart
+    fig = px.bar(
+        comparison_data,
+        x='property',
+        y=['cap_rate', 'cash_on_cash_return', 'total_roi'],
+        title='Return Metrics Comparison (Top 10 Properties)',
+        labels={
+            'property': 'Property',
+            'value': 'Return (%)',
+            'variable': 'Metric'
+        },
+        template='plotly_white',
+        barmode='group',
+        height=500
+    )
+    
+    # Update names in legend
+    fig.update_layout(
+        legend_title_text='Return Metric',
+        xaxis_tickangle=-45
+    )
+    
+    fig.for_each_trace(lambda t: t.update(name = {
+        'cap_rate': 'Cap Rate (%)',
+        'cash_on_cash_return': 'Cash-on-Cash ROI (%)',
+        'total_roi': f'Total {investment_horizon}-Year ROI (%)'
+    }[t.name]))
+    
+    return fig
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, hash_funcs={pd.DataFrame: _frame_fingerprint})
+def _cash_flow_chart(plot_df):
+    """Cash flow vs. appreciation scatter plot, cached on the plotted rows"""
+    fig = px.scatter(
+        plot_df,
+        x='monthly_cash_flow',
+        y='appreciation_rate',
+        size='price',
+        color='cap_rate',
+        hover_name='address',
+        hover_data=['city', 'property_type', 'bedrooms', 'bathrooms', 'price'],
+        title='Cash Flow vs. Appreciation Rate (Top 20 Properties)',
+        labels={
+            'monthly_cash_flow': 'Monthly Cash Flow ($)',
+            'appreciation_rate': 'Annual Appreciation Rate (%)',
+            'price': 'Price ($)',
+            'cap_rate': 'Cap Rate (%)'
+        },
+        template='plotly_white',
+        color_continuous_scale=px.colors.sequential.Viridis,
+        render_mode='webgl'
+    )
+    
+    return fig
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, hash_funcs={pd.DataFrame: _frame_fingerprint})
+def _risk_return_chart(plot_df, frontier_bounds, investment_horizon, risk_level, risk_tolerance):
+    """
+    Risk vs. return scatter plot with its reference lines, cached on the plotted rows and the inputs
+    
+    frontier_bounds holds the (min risk, max risk, min return, max return) corners of all the matches.
+    """
+    fig = px.scatter(
+        plot_df,
+        x='risk_score',
+        y='total_roi',
+        size='price',
+        color='investment_score',
+        hover_name='address',
+        hover_data=['city', 'property_type', 'cap_rate', 'monthly_cash_flow'],
+        title='Risk vs. Return Analysis (Top 20 Properties)',
+        labels={
+            'risk_score': 'Risk Level (1-10)',
+            'total_roi': f'Total {investment_horizon}-Year ROI (%)',
+            'price': 'Price ($)',
+            'investment_score': 'Investment Score'
+        },
+        template='plotly_white',
+        color_continuous_scale=px.colors.sequential.Viridis,
+        render_mode='webgl'
+    )
+    
+    # Add a diagonal reference line (efficient frontier concept)
+    x_min, x_max, y_min, y_max = frontier_bounds
+    if x_max > x_min and y_max > y_min:
+        # The line through the lowest and highest risk/return corners of the matches
+        fig.add_trace(
+            go.Scatter(
+                x=[x_min, x_max],
+                y=[y_min, y_max],
+                mode='lines',
+                showlegend=False
+            )
+        )
+    
+    # Add risk tolerance reference line
+    risk_tolerance_value = 2 + (risk_level * 1.5)  # Scale 1-5 to meaningful range
+    
+    fig.add_vline(
+        x=risk_tolerance_value,
+        line_dash="dash",
+        line_color="red",
+        annotation_text=f"Risk Tolerance: {risk_tolerance}",
+        annotation_position="top"
+    )
+    
+    return fig
 
 def show_property_matching():
     st.title("AI-Powered Property Matching")
@@ -19,21 +273,25 @@ def show_property_matching():
         st.error("No property data available. Please return to the dashboard.")
         return
     
-    data = st.session_state.data
+    # Compact copy of the loaded data so city and property type filters compare integer codes
+    data = _prepare_data(st.session_state.data)
+    
+    # Form options and bounds shared by all three tabs
+    stats = _matching_stats(data)
     
     # Create tabs for different matching features
     tab1, tab2, tab3 = st.tabs(["Preference Matching", "Lifestyle Matching", "Investment Potential"])
     
     with tab1:
-        show_preference_matching(data)
+        show_preference_matching(data, stats)
     
     with tab2:
-        show_lifestyle_matching(data)
+        show_lifestyle_matching(data, stats)
     
     with tab3:
-        show_investment_matching(data)
+        show_investment_matching(data, stats)
 
-def show_preference_matching(data):
+def show_preference_matching(data, stats):
     st.subheader("Smart Property Preference Matching")
     
     st.markdown("""
@@ -46,7 +304,7 @@ def show_preference_matching(data):
         # Location preferences
         st.subheader("Location")
         
-        cities = sorted(data['city'].unique())
+        cities = stats['cities']
         selected_cities = st.multiselect(
             "Preferred Cities/Areas",
             options=cities,
@@ -59,8 +317,7 @@ def show_preference_matching(data):
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            min_price = int(data['price'].min())
-            max_price = int(data['price'].max())
+            min_price, max_price = stats['price']
             price_range = st.slider(
                 "Price Range ($)",
                 min_value=min_price,
@@ -68,7 +325,7 @@ def show_preference_matching(data):
                 value=(min_price, int(min_price + (max_price - min_price) * 0.3))
             )
             
-            property_types = sorted(data['property_type'].unique())
+            property_types = stats['property_types']
             selected_property_types = st.multiselect(
                 "Property Type",
                 options=property_types,
@@ -76,8 +333,7 @@ def show_preference_matching(data):
             )
         
         with col2:
-            min_beds = int(data['bedrooms'].min())
-            max_beds = int(data['bedrooms'].max())
+            min_beds, max_beds = stats['bedrooms']
             bedrooms = st.slider(
                 "Bedrooms",
                 min_value=min_beds,
@@ -85,8 +341,7 @@ def show_preference_matching(data):
                 value=(min_beds, min(min_beds + 2, max_beds))
             )
             
-            min_baths = int(data['bathrooms'].min())
-            max_baths = int(data['bathrooms'].max())
+            min_baths, max_baths = stats['bathrooms']
             bathrooms = st.slider(
                 "Bathrooms",
                 min_value=min_baths,
@@ -95,8 +350,7 @@ def show_preference_matching(data):
             )
         
         with col3:
-            min_sqft = int(data['sqft'].min())
-            max_sqft = int(data['sqft'].max())
+            min_sqft, max_sqft = stats['sqft']
             sqft_range = st.slider(
                 "Square Footage",
                 min_value=min_sqft,
@@ -104,8 +358,7 @@ def show_preference_matching(data):
                 value=(min_sqft, int(min_sqft + (max_sqft - min_sqft) * 0.3))
             )
             
-            min_year = int(data['year_built'].min())
-            max_year = int(data['year_built'].max())
+            min_year, max_year = stats['year_built']
             year_built = st.slider(
                 "Year Built",
                 min_value=min_year,
@@ -151,26 +404,15 @@ def show_preference_matching(data):
     # Generate matches on submit
     if submit_button:
         # Apply basic filtering
-        filtered_data = data.copy()
-        
-        if selected_cities:
-            filtered_data = filtered_data[filtered_data['city'].isin(selected_cities)]
-        
-        filtered_data = filtered_data[
-            (filtered_data['price'] >= price_range[0]) &
-            (filtered_data['price'] <= price_range[1]) &
-            (filtered_data['bedrooms'] >= bedrooms[0]) &
-            (filtered_data['bedrooms'] <= bedrooms[1]) &
-            (filtered_data['bathrooms'] >= bathrooms[0]) &
-            (filtered_data['bathrooms'] <= bathrooms[1]) &
-            (filtered_data['sqft'] >= sqft_range[0]) &
-            (filtered_data['sqft'] <= sqft_range[1]) &
-            (filtered_data['year_built'] >= year_built[0]) &
-            (filtered_data['year_built'] <= year_built[1])
-        ]
-        
-        if selected_property_types:
-            filtered_data = filtered_data[filtered_data['property_type'].isin(selected_property_types)]
+        filters = {
+            'price': price_range,
+            'bedrooms': bedrooms,
+            'bathrooms': bathrooms,
+            'sqft': sqft_range,
+            'year_built': year_built
+        }
+        mask = _basic_filter_mask(data, filters, selected_cities, selected_property_types)
+        filtered_data = data[mask]
         
         # Apply advanced matching
         if not filtered_data.empty:
@@ -194,9 +436,11 @@ def show_preference_matching(data):
                 'year_built': (year_built[0] + year_built[1]) / 2
             }
             
-            # Calculate match scores
-            matches = calculate_match_scores(filtered_data, preference, feature_weights, 
-                                           selected_cities, selected_property_types)
+            # Calculate match scores, memoized on the dataset and the form inputs, and join them onto the candidates
+            matches = filtered_data.assign(match_score=_cached_match_scores(
+                stats['key'], filters, filtered_data, stats['features'][mask], preference,
+                feature_weights, selected_cities, selected_property_types
+            ))
             
             # Display matches
             st.subheader("Your Top Matching Properties")
@@ -206,13 +450,13 @@ def show_preference_matching(data):
                 st.success(f"Found {len(matches)} properties matching your criteria!")
                 
                 # Display top matches as cards
-                show_property_cards(matches.head(5))
+                show_property_cards(matches.nlargest(5, 'match_score'))
                 
                 # Create a match distribution plot
                 st.subheader("Match Score Distribution")
                 
                 fig = px.histogram(
-                    matches,
+                    matches[['match_score']],
                     x='match_score',
                     nbins=20,
                     title='Distribution of Property Match Scores',
@@ -236,7 +480,7 @@ def show_preference_matching(data):
         else:
             st.warning("No properties match your basic criteria. Please broaden your search parameters.")
 
-def show_lifestyle_matching(data):
+def show_lifestyle_matching(data, stats):
     st.subheader("Lifestyle-Based Property Matching")
     
     st.markdown("""
@@ -263,7 +507,7 @@ def show_lifestyle_matching(data):
         with col2:
             work_location = st.selectbox(
                 "Work Location (City/Area)",
-                options=["Work from Home"] + sorted(data['city'].unique().tolist())
+                options=["Work from Home"] + stats['cities']
             )
             
             commute_method = st.selectbox(
@@ -365,18 +609,15 @@ def show_lifestyle_matching(data):
     # Generate lifestyle matches on submit
     if submit_button:
         # For demonstration, simulate neighborhood data that would normally come from external APIs
-        if 'neighborhood_data' not in st.session_state:
+        if 'neighborhood_data' not in st.session_state or st.session_state.get('neighborhood_data_source') is not data:
             st.session_state.neighborhood_data = generate_neighborhood_data(data)
+            st.session_state.neighborhood_data_source = data
         
         neighborhood_data = st.session_state.neighborhood_data
         
-        # Merge property and neighborhood data
-        merged_data = pd.merge(
-            data,
-            neighborhood_data,
-            on='city',
-            how='left'
-        )
+        # Neighborhood data as a NumPy block indexed by city code
+        lookup = _neighborhood_lookup(data, neighborhood_data)
+        columns, neighborhood_block, city_codes = lookup
         
         # Convert lifestyle preferences to scores
         importance_map = {
@@ -399,8 +640,8 @@ def show_lifestyle_matching(data):
             'commute_time': 10 if work_location == "Work from Home" else importance_map[commute_importance]
         }
         
-        # Calculate lifestyle match scores
-        matches = calculate_lifestyle_scores(merged_data, lifestyle_weights, work_location, max_commute)
+        # Calculate lifestyle match scores, memoized on the dataset and the form inputs
+        matches = _cached_lifestyle_scores(stats['key'], data, lookup, lifestyle_weights, work_location, max_commute)
         
         # Display matches
         st.subheader("Your Top Lifestyle-Matched Properties")
@@ -410,7 +651,11 @@ def show_lifestyle_matching(data):
             st.success(f"Found {len(matches)} properties matching your lifestyle preferences!")
             
             # Display top matches with neighborhood information
-            for i, (_, prop) in enumerate(matches.head(5).iterrows()):
+            card_columns = ['address', 'city', 'price', 'bedrooms', 'bathrooms', 'sqft', 'lifestyle_score',
+                            'dining_score', 'outdoor_score', 'school_score', 'quiet_score', 'safety_score', 'commute_time']
+            # Partial selection of the best matches; only the full table below needs a sort
+            top_matches = matches.nlargest(5, 'lifestyle_score')
+            for i, prop in enumerate(top_matches[card_columns].itertuples(index=False)):
                 with st.container():
                     col1, col2 = st.columns([2, 3])
                     
@@ -423,30 +668,30 @@ def show_lifestyle_matching(data):
                         )
                     
                     with col2:
-                        st.markdown(f"### {prop['address']}, {prop['city']}")
-                        st.markdown(f"**${prop['price']:,.0f}** • {prop['bedrooms']} bed • {prop['bathrooms']} bath • {prop['sqft']:,} sqft")
-                        st.markdown(f"**Lifestyle Match:** {prop['lifestyle_score']:.0f}%")
+                        st.markdown(f"### {prop.address}, {prop.city}")
+                        st.markdown(f"**${prop.price:,.0f}** • {prop.bedrooms} bed • {prop.bathrooms} bath • {prop.sqft:,} sqft")
+                        st.markdown(f"**Lifestyle Match:** {prop.lifestyle_score:.0f}%")
                         
                         # Lifestyle highlights
                         highlights = []
                         
-                        if prop['dining_score'] >= 7:
+                        if prop.dining_score >= 7:
                             highlights.append("Great dining & nightlife")
                         
-                        if prop['outdoor_score'] >= 7:
+                        if prop.outdoor_score >= 7:
                             highlights.append("Excellent outdoor recreation")
                         
-                        if prop['school_score'] >= 7 and has_children in ["Yes - Young Children", "Yes - School Age"]:
+                        if prop.school_score >= 7 and has_children in ["Yes - Young Children", "Yes - School Age"]:
                             highlights.append("Top-rated schools")
                         
-                        if prop['quiet_score'] >= 7 and importance_map[quiet_neighborhood] >= 5:
+                        if prop.quiet_score >= 7 and importance_map[quiet_neighborhood] >= 5:
                             highlights.append("Quiet neighborhood")
                         
-                        if prop['safety_score'] >= 8:
+                        if prop.safety_score >= 8:
                             highlights.append("Very safe area")
                         
-                        if work_location != "Work from Home" and prop['commute_time'] <= max_commute:
-                            highlights.append(f"{prop['commute_time']} min commute to {work_location}")
+                        if work_location != "Work from Home" and prop.commute_time <= max_commute:
+                            highlights.append(f"{prop.commute_time:.0f} min commute to {work_location}")
                         
                         st.markdown("**Highlights:** " + ", ".join(highlights))
                 
@@ -456,56 +701,18 @@ def show_lifestyle_matching(data):
             st.subheader("Neighborhood Comparison")
             
             # Prepare data for radar chart
-            top_neighborhoods = matches.head(3)['city'].unique()
-            radar_data = []
+            top_neighborhoods = top_matches.head(3)['city'].unique()
             
             categories = ['Dining', 'Shopping', 'Outdoor', 'Arts', 'Quiet', 'Family', 'Schools', 'Safety']
             
-            for neighborhood in top_neighborhoods:
-                neighborhood_scores = neighborhood_data[neighborhood_data['city'] == neighborhood].iloc[0]
-                
-                radar_data.append({
-                    'category': 'Dining',
-                    'value': neighborhood_scores['dining_score'],
-                    'neighborhood': neighborhood
-                })
-                radar_data.append({
-                    'category': 'Shopping',
-                    'value': neighborhood_scores['shopping_score'],
-                    'neighborhood': neighborhood
-                })
-                radar_data.append({
-                    'category': 'Outdoor',
-                    'value': neighborhood_scores['outdoor_score'],
-                    'neighborhood': neighborhood
-                })
-                radar_data.append({
-                    'category': 'Arts',
-                    'value': neighborhood_scores['arts_score'],
-                    'neighborhood': neighborhood
-                })
-                radar_data.append({
-                    'category': 'Quiet',
-                    'value': neighborhood_scores['quiet_score'],
-                    'neighborhood': neighborhood
-                })
-                radar_data.append({
-                    'category': 'Family',
-                    'value': neighborhood_scores['family_score'],
-                    'neighborhood': neighborhood
-                })
-                radar_data.append({
-                    'category': 'Schools',
-                    'value': neighborhood_scores['school_score'],
-                    'neighborhood': neighborhood
-                })
-                radar_data.append({
-                    'category': 'Safety',
-                    'value': neighborhood_scores['safety_score'],
-                    'neighborhood': neighborhood
-                })
-            
-            radar_df = pd.DataFrame(radar_data)
+            # One row of scores per neighborhood, flattened so each value lines up with its category and neighborhood
+            neighborhood_rows = pd.Index(neighborhood_data['city']).get_indexer(top_neighborhoods)
+            top_scores = neighborhood_block[np.ix_(neighborhood_rows, columns.get_indexer(NEIGHBORHOOD_SCORE_COLUMNS))]
+            radar_df = pd.DataFrame({
+                'category': np.tile(categories, len(top_neighborhoods)),
+                'value': top_scores.ravel(),
+                'neighborhood': np.repeat(top_neighborhoods, len(categories))
+            })
             
             fig = px.line_polar(
                 radar_df, 
@@ -531,18 +738,14 @@ def show_lifestyle_matching(data):
             # Display all matches in a sortable table
             st.subheader("All Lifestyle-Matched Properties")
             
-            # Prepare display DataFrame
+            # Prepare display DataFrame with neighborhood characteristics, added without copying the slice first
             display_df = matches[['address', 'city', 'price', 'bedrooms', 'bathrooms', 
-                                'sqft', 'property_type', 'lifestyle_score']]
-            
-            # Add neighborhood characteristics
-            display_df['Neighborhood Type'] = matches.apply(
-                lambda x: neighborhood_type(x), axis=1
-            )
-            
-            display_df['Commute'] = matches['commute_time'].apply(
-                lambda x: f"{x} min" if work_location != "Work from Home" else "N/A"
-            )
+                                'sqft', 'property_type', 'lifestyle_score']].assign(**{
+                'Neighborhood Type': neighborhood_type(matches),
+                'Commute': matches['commute_time'].apply(
+                    lambda x: f"{x:.0f} min" if work_location != "Work from Home" else "N/A"
+                )
+            })
             
             st.dataframe(
                 display_df.sort_values('lifestyle_score', ascending=False)
@@ -550,7 +753,7 @@ def show_lifestyle_matching(data):
         else:
             st.warning("No properties match your lifestyle preferences. Try adjusting your criteria.")
 
-def show_investment_matching(data):
+def show_investment_matching(data, stats):
     st.subheader("Investment Property Matching")
     
     st.markdown("""
@@ -577,8 +780,7 @@ def show_investment_matching(data):
         col1, col2 = st.columns(2)
         
         with col1:
-            min_price = int(data['price'].min())
-            max_price = int(data['price'].max())
+            min_price, max_price = stats['price']
             budget_range = st.slider(
                 "Investment Budget ($)",
                 min_value=min_price,
@@ -599,7 +801,7 @@ def show_investment_matching(data):
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            cities = sorted(data['city'].unique())
+            cities = stats['cities']
             selected_cities = st.multiselect(
                 "Target Markets",
                 options=cities,
@@ -607,7 +809,7 @@ def show_investment_matching(data):
             )
         
         with col2:
-            property_types = sorted(data['property_type'].unique())
+            property_types = stats['property_types']
             selected_property_types = st.multiselect(
                 "Property Types",
                 options=property_types,
@@ -632,52 +834,27 @@ def show_investment_matching(data):
     # Generate investment matches on submit
     if submit_button:
         # Filter basic property criteria
-        filtered_data = data.copy()
-        
-        if selected_cities:
-            filtered_data = filtered_data[filtered_data['city'].isin(selected_cities)]
-        
-        filtered_data = filtered_data[
-            (filtered_data['price'] >= budget_range[0]) &
-            (filtered_data['price'] <= budget_range[1]) &
-            (filtered_data['bedrooms'] >= min_beds) &
-            (filtered_data['bathrooms'] >= min_baths)
-        ]
-        
-        if selected_property_types:
-            filtered_data = filtered_data[filtered_data['property_type'].isin(selected_property_types)]
+        filters = {
+            'price': budget_range,
+            'bedrooms': (min_beds, None),
+            'bathrooms': (min_baths, None)
+        }
+        filtered_data = data[_basic_filter_mask(data, filters, selected_cities, selected_property_types)]
         
         # Generate investment analysis
         if not filtered_data.empty:
             # In a real app, you'd use actual rental and market data
             # For this demo, we'll simulate realistic rental yields and appreciation rates
-            filtered_data = generate_investment_metrics(filtered_data, down_payment_pct, investment_horizon)
+            filtered_data = filtered_data.join(_cached_investment_metrics(
+                stats['key'], filters, selected_cities, selected_property_types,
+                filtered_data, down_payment_pct, investment_horizon
+            ))
             
-            # Apply investment strategy filters
-            if investment_strategy == "Cash Flow (Rental Income)":
-                # Prioritize cash flow
-                filtered_data['investment_score'] = filtered_data.apply(
-                    lambda x: (x['cash_flow_score'] * 0.6) + 
-                              (x['cap_rate_score'] * 0.3) + 
-                              (x['appreciation_score'] * 0.1),
-                    axis=1
-                )
-            elif investment_strategy == "Appreciation (Long-term Growth)":
-                # Prioritize appreciation
-                filtered_data['investment_score'] = filtered_data.apply(
-                    lambda x: (x['cash_flow_score'] * 0.2) + 
-                              (x['cap_rate_score'] * 0.2) + 
-                              (x['appreciation_score'] * 0.6),
-                    axis=1
-                )
-            else:  # Balanced
-                # Even weighting
-                filtered_data['investment_score'] = filtered_data.apply(
-                    lambda x: (x['cash_flow_score'] * 0.33) + 
-                              (x['cap_rate_score'] * 0.33) + 
-                              (x['appreciation_score'] * 0.34),
-                    axis=1
-                )
+            # Apply investment strategy weights to the cash flow, cap rate and appreciation scores
+            strategy_weights = np.array(INVESTMENT_STRATEGY_WEIGHTS[investment_strategy], dtype=np.float32)
+            filtered_data = filtered_data.assign(investment_score=(
+                filtered_data[['cash_flow_score', 'cap_rate_score', 'appreciation_score']].to_numpy(dtype=np.float32) @ strategy_weights
+            ))
             
             # Apply risk tolerance filter
             risk_map = {
@@ -690,19 +867,22 @@ def show_investment_matching(data):
             
             risk_level = risk_map[risk_tolerance]
             
+            # Risk and cash flow filters narrow one mask, so the data is sliced once
+            keep = np.ones(len(filtered_data), dtype=bool)
+            
             # For demonstration purposes, we'll consider properties with higher ROI but lower cap rates as more risky
             if risk_level <= 2:  # Conservative
-                filtered_data = filtered_data[filtered_data['cap_rate'] >= target_cap_rate]
+                keep &= filtered_data['cap_rate'].to_numpy() >= target_cap_rate
             elif risk_level == 3:  # Moderate
-                filtered_data = filtered_data[filtered_data['cap_rate'] >= (target_cap_rate - 1)]
+                keep &= filtered_data['cap_rate'].to_numpy() >= (target_cap_rate - 1)
             # For aggressive investors, we keep all properties
             
             # Filter by cash flow
             if min_cash_flow > 0:
-                filtered_data = filtered_data[filtered_data['monthly_cash_flow'] >= min_cash_flow]
+                keep &= filtered_data['monthly_cash_flow'].to_numpy() >= min_cash_flow
             
             # Sort by investment score
-            matches = filtered_data.sort_values('investment_score', ascending=False)
+            matches = filtered_data[keep].sort_values('investment_score', ascending=False)
             
             # Display investment opportunities
             if not matches.empty:
@@ -712,7 +892,9 @@ def show_investment_matching(data):
                 st.success(f"Found {len(matches)} potential investment properties matching your criteria!")
                 
                 # Display top investment properties
-                for i, (_, prop) in enumerate(matches.head(5).iterrows()):
+                card_columns = ['address', 'city', 'price', 'bedrooms', 'bathrooms', 'sqft',
+                                'cap_rate', 'monthly_cash_flow', 'cash_on_cash_return', 'investment_score']
+                for i, prop in enumerate(matches.head(5)[card_columns].itertuples(index=False)):
                     with st.container():
                         col1, col2 = st.columns([1, 2])
                         
@@ -725,151 +907,68 @@ def show_investment_matching(data):
                             )
                         
                         with col2:
-                            st.markdown(f"### {prop['address']}, {prop['city']}")
-                            st.markdown(f"**${prop['price']:,.0f}** • {prop['bedrooms']} bed • {prop['bathrooms']} bath • {prop['sqft']:,} sqft")
+                            st.markdown(f"### {prop.address}, {prop.city}")
+                            st.markdown(f"**${prop.price:,.0f}** • {prop.bedrooms} bed • {prop.bathrooms} bath • {prop.sqft:,} sqft")
                             
                             # Key investment metrics
                             col1, col2, col3 = st.columns(3)
                             
                             with col1:
-                                st.metric("Cap Rate", f"{prop['cap_rate']:.2f}%")
+                                st.metric("Cap Rate", f"{prop.cap_rate:.2f}%")
                             
                             with col2:
-                                st.metric("Cash Flow", f"${prop['monthly_cash_flow']:.0f}/mo")
+                                st.metric("Cash Flow", f"${prop.monthly_cash_flow:.0f}/mo")
                             
                             with col3:
-                                st.metric("Cash-on-Cash ROI", f"{prop['cash_on_cash_return']:.2f}%")
+                                st.metric("Cash-on-Cash ROI", f"{prop.cash_on_cash_return:.2f}%")
                             
                             # ROI breakdown
-                            st.progress(int(prop['investment_score']))
-                            st.caption(f"Investment Score: {prop['investment_score']:.0f}%")
+                            st.progress(int(prop.investment_score))
+                            st.caption(f"Investment Score: {prop.investment_score:.0f}%")
                     
                     st.markdown("---")
                 
                 # Investment return comparison
                 st.subheader("Investment Return Comparison")
                 
-                # Prepare data for chart
-                comparison_data = matches.head(10)[['address', 'city', 'cap_rate', 'cash_on_cash_return', 'total_roi', 'appreciation_rate']].copy()
-                
-                # Simplify address for display
-                comparison_data['property'] = comparison_data.apply(
-                    lambda x: f"{x['address'].split(' ')[0]} {x['city']}", axis=1
-                )
-                
-                # Create a grouped bar chart
-                fig = px.bar(
-                    comparison_data,
-                    x='property',
-                    y=['cap_rate', 'cash_on_cash_return', 'total_roi'],
-                    title='Return Metrics Comparison (Top 10 Properties)',
-                    labels={
-                        'property': 'Property',
-                        'value': 'Return (%)',
-                        'variable': 'Metric'
-                    },
-                    template='plotly_white',
-                    barmode='group',
-                    height=500
-                )
-                
-                # Update names in legend
-                fig.update_layout(
-                    legend_title_text='Return Metric',
-                    xaxis_tickangle=-45
+                # Only the reported columns of the top 10 go into the chart
+                fig = _return_comparison_chart(
+                    matches.head(10)[['address', 'city', 'cap_rate', 'cash_on_cash_return', 'total_roi']],
+                    investment_horizon
                 )
                 
-                fig.for_each_trace(lambda t: t.update(name = {
-                    'cap_rate': 'Cap Rate (%)',
-                    'cash_on_cash_return': 'Cash-on-Cash ROI (%)',
-                    'total_roi': f'Total {investment_horizon}-Year ROI (%)'
-                }[t.name]))
-                
                 st.plotly_chart(fig, use_container_width=True)
                 
                 # Cash flow vs. appreciation scatter plot
                 st.subheader("Cash Flow vs. Appreciation Analysis")
                 
-                fig = px.scatter(
-                    matches.head(20),
-                    x='monthly_cash_flow',
-                    y='appreciation_rate',
-                    size='price',
-                    color='cap_rate',
-                    hover_name='address',
-                    hover_data=['city', 'property_type', 'bedrooms', 'bathrooms', 'price'],
-                    title='Cash Flow vs. Appreciation Rate (Top 20 Properties)',
-                    labels={
-                        'monthly_cash_flow': 'Monthly Cash Flow ($)',
-                        'appreciation_rate': 'Annual Appreciation Rate (%)',
-                        'price': 'Price ($)',
-                        'cap_rate': 'Cap Rate (%)'
-                    },
-                    template='plotly_white',
-                    color_continuous_scale=px.colors.sequential.Viridis
-                )
+                # Only the plotted columns of the top 20 go into the figure
+                plot_df = matches.head(20)[['monthly_cash_flow', 'appreciation_rate', 'price', 'cap_rate', 'address',
+                                            'city', 'property_type', 'bedrooms', 'bathrooms']]
+                
+                fig = _cash_flow_chart(plot_df)
                 
                 st.plotly_chart(fig, use_container_width=True)
                 
                 # Risk-return analysis
                 st.subheader("Risk-Return Analysis")
                 
-                # Create a simulated risk score based on cap rate and property characteristics
-                matches['risk_score'] = 10 - matches['cap_rate_score']  # Inverse of cap rate score (lower cap rate = higher risk)
-                
-                # Adjust risk based on property type (multi-family typically less risky)
-                matches.loc[matches['property_type'] == 'Multi-Family', 'risk_score'] -= 1
+                # Create a simulated risk score based on cap rate and property characteristics:
+                # the inverse of the cap rate score (lower cap rate = higher risk), one lower for
+                # multi-family properties (typically less risky), kept within the 1-10 range
+                multi_family = (matches['property_type'] == 'Multi-Family').to_numpy()
+                matches = matches.assign(risk_score=np.clip(
+                    10 - matches['cap_rate_score'].to_numpy() - multi_family, 1, 10
+                ))
                 
-                # Ensure risk score is within 1-10 range
-                matches['risk_score'] = matches['risk_score'].clip(1, 10)
+                plot_df = matches.head(20)[['risk_score', 'total_roi', 'price', 'investment_score', 'address',
+                                            'city', 'property_type', 'cap_rate', 'monthly_cash_flow']]
                 
-                fig = px.scatter(
-                    matches.head(20),
-                    x='risk_score',
-                    y='total_roi',
-                    size='price',
-                    color='investment_score',
-                    hover_name='address',
-                    hover_data=['city', 'property_type', 'cap_rate', 'monthly_cash_flow'],
-                    title='Risk vs. Return Analysis (Top 20 Properties)',
-                    labels={
-                        'risk_score': 'Risk Level (1-10)',
-                        'total_roi': f'Total {investment_horizon}-Year ROI (%)',
-                        'price': 'Price ($)',
-                        'investment_score': 'Investment Score'
-                    },
-                    template='plotly_white',
-                    color_continuous_scale=px.colors.sequential.Viridis
-                )
-                
-                # Add a diagonal reference line (efficient frontier concept)
-                x_range = matches['risk_score'].max() - matches['risk_score'].min()
-                y_range = matches['total_roi'].max() - matches['total_roi'].min()
-                
-                if x_range > 0 and y_range > 0:
-                    slope = y_range / x_range
-                    y_intercept = matches['total_roi'].min() - (slope * matches['risk_score'].min())
-                    
-                    x_values = [matches['risk_score'].min(), matches['risk_score'].max()]
-                    y_values = [slope * x + y_intercept for x in x_values]
-                    
-                    fig.add_trace(
-                        px.line(
-                            x=x_values, 
-                            y=y_values
-                        ).data[0]
-                    )
+                # Corners of the efficient frontier line through all the matches
+                bounds = matches[['risk_score', 'total_roi']].agg(['min', 'max'])
+                frontier_bounds = (*bounds['risk_score'].tolist(), *bounds['total_roi'].tolist())
                 
-                # Add risk tolerance reference line
-                risk_tolerance_value = 2 + (risk_level * 1.5)  # Scale 1-5 to meaningful range
-                
-                fig.add_vline(
-                    x=risk_tolerance_value,
-                    line_dash="dash",
-                    line_color="red",
-                    annotation_text=f"Risk Tolerance: {risk_tolerance}",
-                    annotation_position="top"
-                )
+                fig = _risk_return_chart(plot_df, frontier_bounds, investment_horizon, risk_level, risk_tolerance)
                 
                 st.plotly_chart(fig, use_container_width=True)
                 
@@ -879,15 +978,7 @@ def show_investment_matching(data):
                 display_df = matches[[
                     'address', 'city', 'price', 'property_type', 'bedrooms', 'bathrooms',
                     'monthly_cash_flow', 'cap_rate', 'cash_on_cash_return', 'total_roi', 'investment_score'
-                ]].copy()
-                
-                # Format values
-                display_df['monthly_cash_flow'] = display_df['monthly_cash_flow'].map('${:,.0f}'.format)
-                display_df['cap_rate'] = display_df['cap_rate'].map('{:.2f}%'.format)
-                display_df['cash_on_cash_return'] = display_df['cash_on_cash_return'].map('{:.2f}%'.format)
-                display_df['total_roi'] = display_df['total_roi'].map('{:.2f}%'.format)
-                display_df['investment_score'] = display_df['investment_score'].map('{:.0f}'.format)
-                display_df['price'] = display_df['price'].map('${:,.0f}'.format)
+                ]]
                 
                 # Rename columns
                 display_df.columns = [
@@ -895,348 +986,272 @@ def show_investment_matching(data):
                     'Monthly Cash Flow', 'Cap Rate', 'Cash-on-Cash ROI', f'{investment_horizon}-Year ROI', 'Score'
                 ]
                 
-                st.dataframe(display_df)
+                # Format values at render time so the columns stay numeric and sort correctly
+                st.dataframe(display_df.style.format({
+                    'Price': '${:,.0f}',
+                    'Monthly Cash Flow': '${:,.0f}',
+                    'Cap Rate': '{:.2f}%',
+                    'Cash-on-Cash ROI': '{:.2f}%',
+                    f'{investment_horizon}-Year ROI': '{:.2f}%',
+                    'Score': '{:.0f}'
+                }))
             else:
                 st.warning("No properties match your investment criteria. Try adjusting your parameters.")
         else:
             st.warning("No properties match your basic criteria. Please broaden your search parameters.")
 
-def calculate_match_scores(data, preference, feature_weights, selected_cities, selected_property_types):
-    """Calculate match scores based on user preferences"""
-    # Copy the data to avoid modifying the original
-    matches = data.copy()
-    
-    # Normalize numerical features for fair comparison
-    scaler = MinMaxScaler()
-    
-    # Fit scaler on the entire dataset to get proper min/max ranges
-    numerical_features = ['price', 'sqft', 'bedrooms', 'bathrooms', 'year_built']
-    scaled_data = scaler.fit_transform(data[numerical_features])
-    
-    # Create a DataFrame with the scaled data
-    scaled_df = pd.DataFrame(scaled_data, columns=numerical_features)
-    
-    # Get the scaled preference vector
-    preference_vector = np.array([preference['price'], preference['sqft'], 
-                                 preference['bedrooms'], preference['bathrooms'], 
-                                 preference['year_built']])
-    scaled_preference = scaler.transform([preference_vector])[0]
-    
-    # Calculate the distance for each numerical feature
-    for i, feature in enumerate(numerical_features):
-        # Calculate the absolute difference (distance) between property and preference
-        scaled_df[f'{feature}_distance'] = abs(scaled_df[feature] - scaled_preference[i])
-        
-        # Invert the distance to get a similarity score (1 - distance)
-        scaled_df[f'{feature}_score'] = 1 - scaled_df[f'{feature}_distance']
-        
-        # Apply the feature weight
-        scaled_df[f'{feature}_weighted'] = scaled_df[f'{feature}_score'] * feature_weights[feature]
-    
-    # Calculate city match (binary: 1 if matches preference, 0 otherwise)
-    matches['city_score'] = matches['city'].apply(lambda x: 1 if x in selected_cities else 0)
-    matches['city_weighted'] = matches['city_score'] * feature_weights['city']
-    
-    # Calculate property type match (binary: 1 if matches preference, 0 otherwise)
-    matches['property_type_score'] = matches['property_type'].apply(lambda x: 1 if x in selected_property_types else 0)
-    matches['property_type_weighted'] = matches['property_type_score'] * feature_weights['property_type']
-    
-    # Calculate the overall match score
-    # First get the individual weighted scores for numerical features
-    for feature in numerical_features:
-        matches[f'{feature}_weighted'] = scaled_df[f'{feature}_weighted']
-    
-    # Sum all weighted scores
+def _min_max_scale(features):
+    """
+    Scale each column of a float array to the 0-1 range in place
+    
+    Returns the scaled array with the column minimums and ranges used, so other points can be scaled the same way.
+    Constant columns scale to 0 and missing values are ignored when finding the bounds.
+    """
+    feature_min = np.nanmin(features, axis=0)
+    feature_range = np.nanmax(features, axis=0) - feature_min
+    feature_range[feature_range == 0] = 1
+    features -= feature_min
+    features /= feature_range
+    return features, feature_min, feature_range
+
+def calculate_match_scores(data, features, preference, feature_weights, selected_cities, selected_property_types):
+    """
+    Calculate match scores based on user preferences
+    
+    features holds the MATCH_FEATURES values of each row of data as a float32 array, which is scaled in place.
+    Returns the match_score column indexed like data, leaving data itself untouched.
+    """
+    # Normalize numerical features to the 0-1 range of the candidate set for fair comparison
+    features, feature_min, feature_range = _min_max_scale(features)
+    
+    # Scale the preference vector with the same ranges
+    preference_vector = np.array([preference[feature] for feature in MATCH_FEATURES], dtype=np.float32)
+    scaled_preference = (preference_vector - feature_min) / feature_range
+    
+    # Similarity per feature is 1 minus its distance to the preference; missing values contribute nothing
+    similarity = 1 - np.abs(features - scaled_preference)
+    numerical_weights = np.array([feature_weights[feature] for feature in MATCH_FEATURES], dtype=np.float32)
+    weighted_score = np.nan_to_num(similarity) @ numerical_weights
+    
+    # City and property type matches are binary: 1 if they match the preference, 0 otherwise
+    weighted_score += data['city'].isin(selected_cities).to_numpy() * feature_weights['city']
+    weighted_score += data['property_type'].isin(selected_property_types).to_numpy() * feature_weights['property_type']
+    
+    # Calculate the percentage match, kept within the 0-100 range and rounded to the nearest integer
     total_weight = sum(feature_weights.values())
+    match_score = np.clip(weighted_score / total_weight * 100, 0, 100).round().astype(int)
     
-    weighted_features = [f'{feature}_weighted' for feature in numerical_features] + ['city_weighted', 'property_type_weighted']
-    
-    matches['total_weighted_score'] = matches[weighted_features].sum(axis=1)
-    
-    # Calculate the percentage match
-    matches['match_score'] = (matches['total_weighted_score'] / total_weight) * 100
-    
-    # Ensure the score is within 0-100 range
-    matches['match_score'] = matches['match_score'].clip(0, 100)
-    
-    # Round to nearest integer
-    matches['match_score'] = matches['match_score'].round().astype(int)
-    
-    # Sort by match score
-    matches = matches.sort_values('match_score', ascending=False)
-    
-    return matches
+    return pd.Series(match_score, index=data.index, name='match_score')
 
 def calculate_lifestyle_scores(data, lifestyle_weights, work_location, max_commute):
-    """Calculate lifestyle match scores based on preferences"""
-    matches = data.copy()
-    
-    # Calculate weighted scores for each lifestyle factor
-    lifestyle_factors = list(lifestyle_weights.keys())
+    """Calculate lifestyle match scores based on preferences, returned as a column indexed like data"""
     total_weight = sum(lifestyle_weights.values())
     
-    # Calculate weighted score for each factor
-    for factor in lifestyle_factors:
-        if factor != 'commute_time':  # Handle commute separately
-            matches[f'{factor}_weighted'] = matches[factor] * lifestyle_weights[factor]
+    # Weighted sum of the neighborhood scores in a single matrix-vector product; missing scores contribute nothing
+    factor_weights = np.array([lifestyle_weights[factor] for factor in NEIGHBORHOOD_SCORE_COLUMNS], dtype=np.float32)
+    scores = np.nan_to_num(data[NEIGHBORHOOD_SCORE_COLUMNS].to_numpy(dtype=np.float32))
+    weighted_score = scores @ factor_weights
     
     # Special handling for commute
     if work_location == "Work from Home":
-        matches['commute_weighted'] = lifestyle_weights['commute_time']  # Full score if working from home
+        commute_factor = 1  # Full score if working from home
     else:
         # Inverse score - lower commute time is better
-        # Scale so that commute times <= max_commute get proportionally higher scores
-        # and times > max_commute get proportionally lower scores
-        matches['commute_factor'] = matches.apply(
-            lambda x: max(0, (max_commute - x['commute_time']) / max_commute), axis=1
-        )
-        matches['commute_weighted'] = matches['commute_factor'] * lifestyle_weights['commute_time']
+        # Commute times <= max_commute get proportionally higher scores and longer ones score 0
+        commute_time = data['commute_time'].to_numpy(dtype=np.float32)
+        commute_factor = np.nan_to_num(np.maximum((max_commute - commute_time) / max_commute, 0))
+    weighted_score += commute_factor * lifestyle_weights['commute_time']
     
-    # Sum all weighted factors
-    weighted_factors = [f'{factor}_weighted' for factor in lifestyle_factors[:-1]] + ['commute_weighted']
-    matches['total_weighted_score'] = matches[weighted_factors].sum(axis=1)
+    # Calculate percentage match, kept within the 0-100 range and rounded to the nearest integer
+    lifestyle_score = np.clip(weighted_score / total_weight * 100, 0, 100).round().astype(int)
     
-    # Calculate percentage match
-    matches['lifestyle_score'] = (matches['total_weighted_score'] / total_weight) * 100
+    return pd.Series(lifestyle_score, index=data.index, name='lifestyle_score')
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, hash_funcs={pd.DataFrame: _frame_fingerprint})
+def generate_neighborhood_data(data):
+    """Generate simulated neighborhood data for the cities in the dataset"""
+    cities = np.asarray(data['city'].unique())
+    rng = np.random.default_rng(SIMULATION_SEED)
+    
+    # (low, high) ranges of the neighborhood scores for urban centers, suburban mixes and smaller cities,
+    # in NEIGHBORHOOD_SCORE_COLUMNS order
+    score_ranges = np.array([
+        [(7, 10), (7, 10), (4, 8), (7, 10), (2, 6), (3, 7), (5, 9), (4, 8)],
+        [(5, 8), (6, 9), (5, 9), (4, 8), (5, 8), (6, 9), (6, 9), (6, 9)],
+        [(4, 7), (4, 7), (6, 9), (3, 7), (6, 9), (7, 10), (6, 9), (7, 10)]
+    ], dtype=float)
+    profile = np.select(
+        [np.isin(cities, ['New York', 'Los Angeles', 'San Francisco', 'Chicago']),
+         np.isin(cities, ['Houston', 'Phoenix', 'Dallas', 'San Diego'])],
+        [0, 1],
+        default=2
+    )
     
-    # Ensure the score is within 0-100 range
-    matches['lifestyle_score'] = matches['lifestyle_score'].clip(0, 100)
+    # Generate realistic but randomized scores for every city in one draw
+    scores = rng.uniform(score_ranges[profile, :, 0], score_ranges[profile, :, 1])
     
-    # Round to nearest integer
-    matches['lifestyle_score'] = matches['lifestyle_score'].round().astype(int)
+    df = pd.DataFrame(scores, columns=NEIGHBORHOOD_SCORE_COLUMNS)
+    df.insert(0, 'city', cities)
     
-    # Sort by lifestyle score
-    matches = matches.sort_values('lifestyle_score', ascending=False)
+    # Generate commute times between every pair of cities in one draw, with short commutes within the same city
+    commute_times = rng.integers(20, 90, size=(len(cities), len(cities)))
+    np.fill_diagonal(commute_times, 10)
     
-    return matches
-
-def generate_neighborhood_data(data):
-    """Generate simulated neighborhood data for the cities in the dataset"""
-    cities = data['city'].unique()
-    neighborhood_data = []
-    
-    for city in cities:
-        # Generate realistic but randomized scores
-        if city in ['New York', 'Los Angeles', 'San Francisco', 'Chicago']:
-            # Urban centers
-            dining_score = np.random.uniform(7, 10)
-            shopping_score = np.random.uniform(7, 10)
-            outdoor_score = np.random.uniform(4, 8)
-            arts_score = np.random.uniform(7, 10)
-            quiet_score = np.random.uniform(2, 6)
-            family_score = np.random.uniform(3, 7)
-            school_score = np.random.uniform(5, 9)
-            safety_score = np.random.uniform(4, 8)
-        elif city in ['Houston', 'Phoenix', 'Dallas', 'San Diego']:
-            # Suburban mix
-            dining_score = np.random.uniform(5, 8)
-            shopping_score = np.random.uniform(6, 9)
-            outdoor_score = np.random.uniform(5, 9)
-            arts_score = np.random.uniform(4, 8)
-            quiet_score = np.random.uniform(5, 8)
-            family_score = np.random.uniform(6, 9)
-            school_score = np.random.uniform(6, 9)
-            safety_score = np.random.uniform(6, 9)
-        else:
-            # Smaller cities
-            dining_score = np.random.uniform(4, 7)
-            shopping_score = np.random.uniform(4, 7)
-            outdoor_score = np.random.uniform(6, 9)
-            arts_score = np.random.uniform(3, 7)
-            quiet_score = np.random.uniform(6, 9)
-            family_score = np.random.uniform(7, 10)
-            school_score = np.random.uniform(6, 9)
-            safety_score = np.random.uniform(7, 10)
-        
-        # Generate commute times for each city (to all other cities)
-        commute_times = {}
-        for dest_city in cities:
-            if dest_city == city:
-                commute_times[dest_city] = 10  # Short commute within same city
-            else:
-                # Generate a realistic commute time based on city pair
-                commute_times[dest_city] = np.random.randint(20, 90)
-        
-        neighborhood_data.append({
-            'city': city,
-            'dining_score': dining_score,
-            'shopping_score': shopping_score,
-            'outdoor_score': outdoor_score,
-            'arts_score': arts_score,
-            'quiet_score': quiet_score,
-            'family_score': family_score,
-            'school_score': school_score,
-            'safety_score': safety_score,
-            'commute_times': commute_times
-        })
-    
-    # Convert to DataFrame
-    df = pd.DataFrame(neighborhood_data)
-    
-    # Expand commute times into separate columns for each destination city
-    for city in cities:
-        df[f'commute_to_{city}'] = df['commute_times'].apply(lambda x: x.get(city, 60))
-    
-    # Drop the dictionary column
-    df = df.drop(columns=['commute_times'])
-    
-    return df
+    # One column of commute times to each destination city
+    commute_columns = pd.DataFrame(commute_times, columns=[f'commute_to_{city}' for city in cities])
+    
+    return pd.concat([df, commute_columns], axis=1)
 
-def neighborhood_type(row):
-    """Determine neighborhood type based on scores"""
-    if row['dining_score'] >= 7 and row['arts_score'] >= 7:
-        return "Urban/Cultural"
-    elif row['outdoor_score'] >= 7 and row['quiet_score'] >= 7:
-        return "Suburban/Outdoor"
-    elif row['family_score'] >= 7 and row['school_score'] >= 7:
-        return "Family-Friendly"
-    elif row['dining_score'] >= 6 and row['shopping_score'] >= 6:
-        return "Mixed-Use"
-    else:
-        return "Residential"
+def neighborhood_type(data):
+    """Determine neighborhood type for each row based on scores"""
+    # Conditions are checked in order, so the first one a row meets decides its type
+    conditions = [
+        (data['dining_score'] >= 7) & (data['arts_score'] >= 7),
+        (data['outdoor_score'] >= 7) & (data['quiet_score'] >= 7),
+        (data['family_score'] >= 7) & (data['school_score'] >= 7),
+        (data['dining_score'] >= 6) & (data['shopping_score'] >= 6)
+    ]
+    choices = ["Urban/Cultural", "Suburban/Outdoor", "Family-Friendly", "Mixed-Use"]
+    return np.select(conditions, choices, default="Residential")
 
 def generate_investment_metrics(data, down_payment_pct, holding_period):
-    """Generate investment metrics for properties based on their characteristics"""
-    investment_data = data.copy()
+    """
+    Generate investment metrics for properties based on their characteristics
     
-    # Simulate rental income (typically 0.5-1% of property value monthly)
-    investment_data['monthly_rent'] = investment_data.apply(
-        lambda x: (x['price'] * np.random.uniform(0.005, 0.01)) / 12, axis=1
-    )
+    Returns only the new metric columns, indexed like data, for the caller to join.
+    """
+    # Collect the metric columns as NumPy arrays and build the frame once at the end
+    m = {}
+    price = data['price'].to_numpy(dtype=float)
+    n = len(price)
+    
+    rng = np.random.default_rng(SIMULATION_SEED)
     
-    # Simulate annual property tax (1-2% of property value)
-    investment_data['annual_property_tax'] = investment_data['price'] * np.random.uniform(0.01, 0.02)
+    # Draw the per-property rates in one batch: rental yield (0.5-1% of property value), vacancy (3-8%),
+    # maintenance (5-10% of annual rent) and property management (8-12% of rent)
+    rent_yield, vacancy_rate, maintenance_rate, management_rate = rng.uniform(
+        [0.005, 0.03, 0.05, 0.08], [0.01, 0.08, 0.1, 0.12], size=(n, 4)
+    ).T
     
-    # Simulate annual insurance (0.3-0.5% of property value)
-    investment_data['annual_insurance'] = investment_data['price'] * np.random.uniform(0.003, 0.005)
+    # Property tax (1-2% of property value) and insurance (0.3-0.5%) rates are shared by all properties
+    tax_rate, insurance_rate = rng.uniform([0.01, 0.003], [0.02, 0.005])
     
-    # Simulate vacancy rate (3-8%)
-    investment_data['vacancy_rate'] = np.random.uniform(0.03, 0.08, size=len(investment_data))
+    # Simulate rental income
+    m['monthly_rent'] = price * rent_yield / 12
     
-    # Simulate maintenance costs (5-10% of annual rent)
-    investment_data['maintenance_rate'] = np.random.uniform(0.05, 0.1, size=len(investment_data))
+    # Simulate annual property tax and insurance
+    m['annual_property_tax'] = price * tax_rate
+    m['annual_insurance'] = price * insurance_rate
     
-    # Simulate property management costs (8-12% of rent)
-    investment_data['management_rate'] = np.random.uniform(0.08, 0.12, size=len(investment_data))
+    # Simulate vacancy, maintenance and property management rates
+    m['vacancy_rate'] = vacancy_rate
+    m['maintenance_rate'] = maintenance_rate
+    m['management_rate'] = management_rate
     
     # Simulate mortgage details
-    investment_data['down_payment'] = investment_data['price'] * (down_payment_pct / 100)
-    investment_data['loan_amount'] = investment_data['price'] - investment_data['down_payment']
+    m['down_payment'] = price * (down_payment_pct / 100)
+    m['loan_amount'] = price - m['down_payment']
     
     # Assume a 30-year fixed mortgage at 4.5% interest
     mortgage_rate = 0.045
-    investment_data['monthly_mortgage'] = investment_data.apply(
-        lambda x: (x['loan_amount'] * (mortgage_rate/12 * (1 + mortgage_rate/12)**(30*12)) / 
-                  ((1 + mortgage_rate/12)**(30*12) - 1)) if x['loan_amount'] > 0 else 0,
-        axis=1
-    )
+    monthly_rate = mortgage_rate / 12
+    annuity_factor = (monthly_rate * (1 + monthly_rate)**(30*12)) / ((1 + monthly_rate)**(30*12) - 1)
+    m['monthly_mortgage'] = np.where(m['loan_amount'] > 0, m['loan_amount'] * annuity_factor, 0.0)
     
     # Calculate annual income and expenses
-    investment_data['annual_rental_income'] = investment_data['monthly_rent'] * 12
-    investment_data['annual_vacancy_cost'] = investment_data['annual_rental_income'] * investment_data['vacancy_rate']
-    investment_data['annual_maintenance'] = investment_data['annual_rental_income'] * investment_data['maintenance_rate']
-    investment_data['annual_management'] = investment_data['annual_rental_income'] * investment_data['management_rate']
-    
-    investment_data['total_annual_expenses'] = (
-        investment_data['annual_property_tax'] +
-        investment_data['annual_insurance'] +
-        investment_data['annual_vacancy_cost'] +
-        investment_data['annual_maintenance'] +
-        investment_data['annual_management']
+    m['annual_rental_income'] = m['monthly_rent'] * 12
+    m['annual_vacancy_cost'] = m['annual_rental_income'] * m['vacancy_rate']
+    m['annual_maintenance'] = m['annual_rental_income'] * m['maintenance_rate']
+    m['annual_management'] = m['annual_rental_income'] * m['management_rate']
+    
+    m['total_annual_expenses'] = (
+        m['annual_property_tax'] +
+        m['annual_insurance'] +
+        m['annual_vacancy_cost'] +
+        m['annual_maintenance'] +
+        m['annual_management']
     )
     
-    investment_data['annual_mortgage_payments'] = investment_data['monthly_mortgage'] * 12
+    m['annual_mortgage_payments'] = m['monthly_mortgage'] * 12
     
     # Calculate net operating income (NOI) and cash flow
-    investment_data['noi'] = investment_data['annual_rental_income'] - investment_data['total_annual_expenses']
-    investment_data['annual_cash_flow'] = investment_data['noi'] - investment_data['annual_mortgage_payments']
-    investment_data['monthly_cash_flow'] = investment_data['annual_cash_flow'] / 12
-    
-    # Calculate cap rate
-    investment_data['cap_rate'] = (investment_data['noi'] / investment_data['price']) * 100
+    m['noi'] = m['annual_rental_income'] - m['total_annual_expenses']
+    m['annual_cash_flow'] = m['noi'] - m['annual_mortgage_payments']
+    m['monthly_cash_flow'] = m['annual_cash_flow'] / 12
     
-    # Calculate cash-on-cash return
-    investment_data['cash_on_cash_return'] = (investment_data['annual_cash_flow'] / investment_data['down_payment']) * 100
+    # Calculate cap rate and cash-on-cash return; a zero price yields inf/NaN as pandas division would
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m['cap_rate'] = (m['noi'] / price) * 100
+        m['cash_on_cash_return'] = (m['annual_cash_flow'] / m['down_payment']) * 100
     
     # Simulate appreciation rates based on city and property type
-    investment_data['appreciation_rate'] = investment_data.apply(
-        lambda x: get_appreciation_rate(x['city'], x['property_type']), axis=1
-    )
+    m['appreciation_rate'] = get_appreciation_rates(data['city'], data['property_type'], rng)
     
     # Calculate future value
-    investment_data['future_value'] = investment_data.apply(
-        lambda x: x['price'] * (1 + x['appreciation_rate']/100) ** holding_period, axis=1
-    )
+    m['future_value'] = price * (1 + m['appreciation_rate'] / 100) ** holding_period
     
     # Calculate remaining loan balance (simplified)
-    investment_data['remaining_loan'] = investment_data.apply(
-        lambda x: max(0, x['loan_amount'] * (1 - (holding_period / 30))), axis=1
-    )
+    m['remaining_loan'] = np.maximum(0, m['loan_amount'] * (1 - (holding_period / 30)))
     
     # Calculate equity and total return
-    investment_data['future_equity'] = investment_data['future_value'] - investment_data['remaining_loan']
-    investment_data['equity_gain'] = investment_data['future_equity'] - investment_data['down_payment']
-    investment_data['total_cash_flow'] = investment_data['annual_cash_flow'] * holding_period
-    investment_data['total_profit'] = investment_data['equity_gain'] + investment_data['total_cash_flow']
-    investment_data['total_roi'] = (investment_data['total_profit'] / investment_data['down_payment']) * 100
-    
-    # Calculate normalized scores for comparison (0-100 scale)
-    max_cap_rate = investment_data['cap_rate'].max()
-    if max_cap_rate > 0:
-        investment_data['cap_rate_score'] = (investment_data['cap_rate'] / max_cap_rate) * 100
-    else:
-        investment_data['cap_rate_score'] = 0
-    
-    max_cash_flow = investment_data['monthly_cash_flow'].max()
-    if max_cash_flow > 0:
-        investment_data['cash_flow_score'] = (investment_data['monthly_cash_flow'] / max_cash_flow) * 100
-    else:
-        investment_data['cash_flow_score'] = 0
-    
-    max_appreciation = investment_data['appreciation_rate'].max()
-    if max_appreciation > 0:
-        investment_data['appreciation_score'] = (investment_data['appreciation_rate'] / max_appreciation) * 100
-    else:
-        investment_data['appreciation_score'] = 0
-    
-    return investment_data
+    m['future_equity'] = m['future_value'] - m['remaining_loan']
+    m['equity_gain'] = m['future_equity'] - m['down_payment']
+    m['total_cash_flow'] = m['annual_cash_flow'] * holding_period
+    m['total_profit'] = m['equity_gain'] + m['total_cash_flow']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        m['total_roi'] = (m['total_profit'] / m['down_payment']) * 100
+    
+    # Calculate normalized scores for comparison (0-100 scale); NaN metrics are skipped like Series.max
+    for metric, score in [('cap_rate', 'cap_rate_score'),
+                          ('monthly_cash_flow', 'cash_flow_score'),
+                          ('appreciation_rate', 'appreciation_score')]:
+        max_value = np.nanmax(m[metric]) if n else np.nan
+        m[score] = m[metric] / max_value * 100 if max_value > 0 else np.zeros(n)
+    
+    return pd.DataFrame(m, index=data.index)
 
-def get_appreciation_rate(city, property_type):
-    """Simulate different appreciation rates based on city and property type"""
-    # Define base rates for different cities
+def get_appreciation_rates(cities, property_types, rng):
+    """Simulate different appreciation rates for each property based on its city and property type"""
+    # Define base rate ranges for different cities
     city_rates = {
-        'New York': np.random.uniform(3.5, 5.0),
-        'Los Angeles': np.random.uniform(4.0, 5.5),
-        'Chicago': np.random.uniform(2.0, 3.5),
-        'Houston': np.random.uniform(2.5, 4.0),
-        'Phoenix': np.random.uniform(3.0, 5.0),
-        'Philadelphia': np.random.uniform(2.0, 3.5),
-        'San Antonio': np.random.uniform(2.5, 4.0),
-        'San Diego': np.random.uniform(3.5, 5.0),
-        'Dallas': np.random.uniform(3.0, 4.5),
-        'San Jose': np.random.uniform(4.0, 6.0)
+        'New York': (3.5, 5.0),
+        'Los Angeles': (4.0, 5.5),
+        'Chicago': (2.0, 3.5),
+        'Houston': (2.5, 4.0),
+        'Phoenix': (3.0, 5.0),
+        'Philadelphia': (2.0, 3.5),
+        'San Antonio': (2.5, 4.0),
+        'San Diego': (3.5, 5.0),
+        'Dallas': (3.0, 4.5),
+        'San Jose': (4.0, 6.0)
     }
     
-    # Get base rate for city, or use average if city not in dictionary
-    base_rate = city_rates.get(city, np.random.uniform(2.5, 4.0))
-    
-    # Adjust for property type
-    if property_type == 'Single Family':
-        adjustment = np.random.uniform(0.0, 0.5)
-    elif property_type == 'Multi-Family':
-        adjustment = np.random.uniform(0.2, 0.7)
-    elif property_type == 'Condo':
-        adjustment = np.random.uniform(-0.5, 0.2)
-    elif property_type == 'Townhouse':
-        adjustment = np.random.uniform(-0.3, 0.3)
-    else:
-        adjustment = 0
+    # Define adjustment ranges for property types
+    type_adjustments = {
+        'Single Family': (0.0, 0.5),
+        'Multi-Family': (0.2, 0.7),
+        'Condo': (-0.5, 0.2),
+        'Townhouse': (-0.3, 0.3)
+    }
     
-    return base_rate + adjustment
+    # Look up the ranges once per distinct city and property type, then gather them for each property by code;
+    # cities not in the table use an average range and other property types get no adjustment.
+    # The default range is appended last so that code -1 (missing value) selects it.
+    city_codes, city_values = pd.factorize(cities)
+    type_codes, type_values = pd.factorize(property_types)
+    base_bounds = np.array([city_rates.get(city, (2.5, 4.0)) for city in city_values] + [(2.5, 4.0)])[city_codes]
+    adjustment_bounds = np.array([type_adjustments.get(t, (0.0, 0.0)) for t in type_values] + [(0.0, 0.0)])[type_codes]
+    
+    # Draw the base rate and the adjustment of every property in one batch
+    lows = np.column_stack([base_bounds[:, 0], adjustment_bounds[:, 0]])
+    highs = np.column_stack([base_bounds[:, 1], adjustment_bounds[:, 1]])
+    return rng.uniform(lows, highs).sum(axis=1)
 
 def show_property_cards(properties):
     """Display property cards for top matches"""
-    for i, (_, prop) in enumerate(properties.iterrows()):
+    card_columns = [col for col in ['address', 'city', 'price', 'bedrooms', 'bathrooms', 'sqft', 'match_score',
+                                    'year_built', 'property_type', 'days_on_market'] if col in properties.columns]
+    for i, prop in enumerate(properties[card_columns].itertuples(index=False)):
         with st.container():
             col1, col2 = st.columns([1, 3])
             
@@ -1249,21 +1264,21 @@ def show_property_cards(properties):
                 )
             
             with col2:
-                st.markdown(f"### {prop['address']}, {prop['city']}")
-                st.markdown(f"**${prop['price']:,.0f}** • {prop['bedrooms']} bed • {prop['bathrooms']} bath • {prop['sqft']:,} sqft")
-                st.markdown(f"**Match Score:** {prop['match_score']}%")
+                st.markdown(f"### {prop.address}, {prop.city}")
+                st.markdown(f"**${prop.price:,.0f}** • {prop.bedrooms} bed • {prop.bathrooms} bath • {prop.sqft:,} sqft")
+                st.markdown(f"**Match Score:** {prop.match_score}%")
                 
                 # Property features
                 features = []
                 
-                if 'year_built' in prop:
-                    features.append(f"Built in {int(prop['year_built'])}")
+                if hasattr(prop, 'year_built'):
+                    features.append(f"Built in {int(prop.year_built)}")
                 
-                if 'property_type' in prop:
-                    features.append(prop['property_type'])
+                if hasattr(prop, 'property_type'):
+                    features.append(prop.property_type)
                 
-                if 'days_on_market' in prop:
-                    features.append(f"{int(prop['days_on_market'])} days on market")
+                if hasattr(prop, 'days_on_market'):
+                    features.append(f"{int(prop.days_on_market)} days on market")
                 
                 st.markdown("**Features:** " + ", ".join(features))
         
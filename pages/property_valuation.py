@@ -4,6 +4,100 @@ import numpy as np
 import plotly.express as px
 from utils.prediction import train_price_prediction_model, predict_property_price
 
+# Seed for the simulated rents and appreciation rates, so the same city always simulates the same values
+SIMULATION_SEED = 42
+
+# Synthetic neighborhoods assigned to properties when the data has none
+NEIGHBORHOODS = ['Downtown', 'Uptown', 'Westside', 'Eastside', 'Northend', 'Southside']
+
+# Number of distinct datasets whose models and derived data are kept in the cache
+CACHE_MAX_ENTRIES = 8
+
+# Columns used by the model and charts, hashed to detect when the loaded data changes
+FINGERPRINT_COLUMNS = ['property_id', 'address', 'city', 'property_type', 'bedrooms', 'bathrooms',
+                       'sqft', 'year_built', 'price', 'latitude', 'longitude']
+
+def _data_fingerprint(data):
+    """Cheap (row count, columns, content hash) fingerprint of the loaded data, computed once per dataset"""
+    fingerprint = st.session_state.get('property_valuation_fingerprint')
+    if fingerprint is None or fingerprint['source'] is not data:
+        columns = [col for col in FINGERPRINT_COLUMNS if col in data.columns]
+        fingerprint = {
+            'source': data,
+            'key': (len(data), tuple(data.columns), int(pd.util.hash_pandas_object(data[columns], index=False).sum()))
+        }
+        st.session_state.property_valuation_fingerprint = fingerprint
+    return fingerprint['key']
+
+@st.cache_resource(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _get_model(data_hash, _data):
+    """Train the price prediction model once per distinct dataset"""
+    return train_price_prediction_model(_data)
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _form_options(data_hash, _data):
+    """Sorted city and property type options plus year built and square footage bounds, computed once per dataset"""
+    bounds = _data[['year_built', 'sqft']].agg(['min', 'max'])
+    return {
+        'cities': sorted(_data['city'].unique()),
+        'property_types': sorted(_data['property_type'].unique()),
+        'year_built': (int(bounds.at['min', 'year_built']), int(bounds.at['max', 'year_built'])),
+        'sqft': (int(bounds.at['min', 'sqft']), int(bounds.at['max', 'sqft']))
+    }
+
+@st.cache_resource(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _index_by_city_type(data_hash, _data):
+    """Properties grouped by (city, property type), so comparable searches only scan one small group"""
+    return {key: group for key, group in _data.groupby(['city', 'property_type'], sort=False)}
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _city_price_stats(data_hash, _data):
+    """Price mean and median per city, computed in a single groupby pass"""
+    return _data.groupby('city')['price'].agg(['mean', 'median']).to_dict('index')
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _city_slice(data_hash, _data, city):
+    """Properties in one city with their neighborhoods, filtered and assigned once per dataset and city"""
+    city_data = _data[_data['city'] == city]
+    
+    # Create simulated neighborhoods (since we don't have actual neighborhood data)
+    if 'neighborhood' not in city_data.columns:
+        # Assign properties to neighborhoods randomly but consistently with a single gather by property ID
+        neighborhoods = np.array(NEIGHBORHOODS)
+        city_data = city_data.assign(
+            neighborhood=neighborhoods[city_data['property_id'].to_numpy() % len(neighborhoods)]
+        )
+    
+    return city_data
+
+@st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES)
+def _city_map(data_hash, _city_data, city):
+    """Property value map of one city, built once per dataset and city"""
+    # Create a scatter map of properties
+    fig = px.scatter_mapbox(
+        _city_data,
+        lat='latitude', 
+        lon='longitude',
+        color='price',
+        size='sqft',
+        color_continuous_scale=px.colors.sequential.Viridis,
+        hover_name='address',
+        hover_data=['price', 'bedrooms', 'bathrooms', 'sqft', 'property_type'],
+        title=f'Property Values in {city}',
+        zoom=10,
+        height=500
+    )
+    
+    # Using Open Street Map for the base map (no API key required)
+    fig.update_layout(mapbox_style='open-street-map')
+    
+    # Format the hover template to show price as currency
+    fig.update_traces(
+        hovertemplate='<b>%{hovertext}</b><br>Price: $%{customdata[0]:,.0f}<br>Beds: %{customdata[1]}<br>Baths: %{customdata[2]}<br>Sqft: %{customdata[3]:,}<br>Type: %{customdata[4]}'
+    )
+    
+    return fig
+
 def show_property_valuation():
     st.title("AI-Driven Property Valuation")
     
@@ -18,9 +112,11 @@ def show_property_valuation():
         return
     
     data = st.session_state.data
+    data_hash = _data_fingerprint(data)
     
-    # Train the prediction model with all data
-    model, preprocessor, features, mae, r2 = train_price_prediction_model(data)
+    # Train the prediction model with all data, reusing the fitted model across reruns
+    model, preprocessor, features, mae, r2 = _get_model(data_hash, data)
+    options = _form_options(data_hash, data)
     
     if model is None:
         st.error("Unable to train the valuation model. Not enough data available.")
@@ -51,17 +147,15 @@ def show_property_valuation():
             
             with col1:
                 # Location
-                cities = sorted(data['city'].unique())
-                city = st.selectbox("City", options=cities)
+                city = st.selectbox("City", options=options['cities'])
                 
                 # Property details
-                property_types = sorted(data['property_type'].unique())
-                property_type = st.selectbox("Property Type", options=property_types)
+                property_type = st.selectbox("Property Type", options=options['property_types'])
                 
                 year_built = st.number_input(
                     "Year Built", 
-                    min_value=int(data['year_built'].min()),
-                    max_value=int(data['year_built'].max()),
+                    min_value=options['year_built'][0],
+                    max_value=options['year_built'][1],
                     value=2000
                 )
             
@@ -71,8 +165,8 @@ def show_property_valuation():
                 bathrooms = st.number_input("Bathrooms", min_value=1, max_value=10, value=2)
                 sqft = st.number_input(
                     "Square Footage", 
-                    min_value=int(data['sqft'].min()),
-                    max_value=int(data['sqft'].max()),
+                    min_value=options['sqft'][0],
+                    max_value=options['sqft'][1],
                     value=2000
                 )
             
@@ -152,13 +246,12 @@ def show_property_valuation():
                 # Find comparable properties
                 st.subheader("Comparable Properties")
                 
-                # Filter for similar properties
-                similar_props = data[
-                    (data['city'] == city) &
-                    (data['property_type'] == property_type) &
-                    (data['bedrooms'] == bedrooms) &
-                    (data['bathrooms'] == bathrooms) &
-                    (data['sqft'].between(sqft * 0.8, sqft * 1.2))
+                # Filter for similar properties within the same city and property type
+                group = _index_by_city_type(data_hash, data).get((city, property_type), data.iloc[:0])
+                similar_props = group[
+                    (group['bedrooms'] == bedrooms) &
+                    (group['bathrooms'] == bathrooms) &
+                    (group['sqft'].between(sqft * 0.8, sqft * 1.2))
                 ]
                 
                 if not similar_props.empty:
@@ -172,7 +265,7 @@ def show_property_valuation():
                     st.info("No closely comparable properties found in our database.")
                 
                 # Market positioning
-                city_avg = data[data['city'] == city]['price'].mean()
+                city_avg = _city_price_stats(data_hash, data)[city]['mean']
                 
                 if predicted_price > city_avg:
                     premium_pct = ((predicted_price - city_avg) / city_avg) * 100
@@ -191,18 +284,11 @@ def show_property_valuation():
         """)
         
         # Select a city to analyze
-        city = st.selectbox("Select City for Analysis", options=sorted(data['city'].unique()), key="neighborhood_city")
+        city = st.selectbox("Select City for Analysis", options=options['cities'], key="neighborhood_city")
         
         if city:
-            # Filter data for the selected city
-            city_data = data[data['city'] == city]
-            
-            # Create simulated neighborhoods (since we don't have actual neighborhood data)
-            if 'neighborhood' not in city_data.columns:
-                # Create synthetic neighborhoods based on lat/long clustering (simplified for demo)
-                neighborhoods = ['Downtown', 'Uptown', 'Westside', 'Eastside', 'Northend', 'Southside']
-                # Assign properties to neighborhoods randomly but consistently
-                city_data['neighborhood'] = city_data['property_id'].apply(lambda x: neighborhoods[x % len(neighborhoods)])
+            # Filter data for the selected city and assign its neighborhoods, reusing the result across reruns
+            city_data = _city_slice(data_hash, data, city)
             
             # Calculate average prices by neighborhood
             neighborhood_prices = city_data.groupby('neighborhood')['price'].agg(['mean', 'median', 'count']).reset_index()
@@ -211,28 +297,8 @@ def show_property_valuation():
             # Display the map
             st.subheader(f"Property Value Map for {city}")
             
-            # Create a scatter map of properties
-            fig = px.scatter_mapbox(
-                city_data,
-                lat='latitude', 
-                lon='longitude',
-                color='price',
-                size='sqft',
-                color_continuous_scale=px.colors.sequential.Viridis,
-                hover_name='address',
-                hover_data=['price', 'bedrooms', 'bathrooms', 'sqft', 'property_type'],
-                title=f'Property Values in {city}',
-                zoom=10,
-                height=500
-            )
-            
-            # Using Open Street Map for the base map (no API key required)
-            fig.update_layout(mapbox_style='open-street-map')
-            
-            # Format the hover template to show price as currency
-            fig.update_traces(
-                hovertemplate='<b>%{hovertext}</b><br>Price: $%{customdata[0]:,.0f}<br>Beds: %{customdata[1]}<br>Baths: %{customdata[2]}<br>Sqft: %{customdata[3]:,}<br>Type: %{customdata[4]}'
-            )
+            # Reuse the city's map figure across reruns
+            fig = _city_map(data_hash, city_data, city)
             
             st.plotly_chart(fig, use_container_width=True)
             
@@ -274,31 +340,26 @@ def show_property_valuation():
             
             forecast_years = st.slider("Forecast Period (Years)", min_value=1, max_value=5, value=3)
             
-            # Calculate neighborhood appreciation rates (simulated)
-            appreciation_data = []
-            
-            for index, row in neighborhood_prices.iterrows():
-                # Calculate simulated appreciation rate based on current prices
-                # Higher-priced neighborhoods typically appreciate faster
-                base_appreciation = np.random.uniform(0.02, 0.05)  # Base annual appreciation between 2-5%
-                price_factor = row['mean'] / neighborhood_prices['mean'].max()  # Higher prices get higher appreciation
-                appreciation_rate = base_appreciation * (0.8 + (0.4 * price_factor))  # Adjust appreciation based on price
-                
-                current_price = row['mean']
-                neighborhood = row['neighborhood']
-                
-                for year in range(1, forecast_years + 1):
-                    forecasted_price = current_price * (1 + appreciation_rate) ** year
-                    
-                    appreciation_data.append({
-                        'neighborhood': neighborhood,
-                        'year': 2023 + year,
-                        'forecasted_price': forecasted_price,
-                        'appreciation_rate': appreciation_rate * 100  # Convert to percentage
-                    })
-            
-            # Convert to DataFrame
-            forecast_df = pd.DataFrame(appreciation_data)
+            # Calculate neighborhood appreciation rates (simulated), one per neighborhood:
+            # a base annual appreciation between 2-5%, adjusted up for higher-priced neighborhoods
+            # since they typically appreciate faster
+            rng = np.random.default_rng(SIMULATION_SEED)
+            mean_prices = neighborhood_prices['mean'].to_numpy(dtype=float)
+            base_appreciation = rng.uniform(0.02, 0.05, size=len(mean_prices))
+            price_factor = mean_prices / mean_prices.max()
+            appreciation_rates = base_appreciation * (0.8 + (0.4 * price_factor))
+            
+            # Compound every neighborhood's price over the forecast years in one broadcast
+            years = np.arange(1, forecast_years + 1)
+            forecasted_prices = mean_prices[:, None] * (1 + appreciation_rates[:, None]) ** years
+            
+            # Long-form frame with one row per neighborhood and year
+            forecast_df = pd.DataFrame({
+                'neighborhood': np.repeat(neighborhood_prices['neighborhood'].to_numpy(), forecast_years),
+                'year': np.tile(2023 + years, len(mean_prices)),
+                'forecasted_price': forecasted_prices.ravel(),
+                'appreciation_rate': np.repeat(appreciation_rates * 100, forecast_years)  # Convert to percentage
+            })
             
             # Create forecast visualization
             fig = px.line(
@@ -341,13 +402,16 @@ def show_property_valuation():
             # Investment opportunity recommendations
             st.subheader("Investment Opportunity Analysis")
             
-            # Calculate price-to-rent ratios (simulated since we don't have real rent data)
-            city_data['monthly_rent'] = city_data.apply(
-                lambda x: x['price'] * np.random.uniform(0.005, 0.008) / 12, axis=1
+            # Calculate price-to-rent ratios (simulated since we don't have real rent data),
+            # drawing every property's rental yield in one call
+            rng = np.random.default_rng(SIMULATION_SEED)
+            price = city_data['price'].to_numpy(dtype=float)
+            monthly_rent = price * rng.uniform(0.005, 0.008, size=len(price)) / 12
+            city_data = city_data.assign(
+                monthly_rent=monthly_rent,
+                price_to_rent_ratio=price / (monthly_rent * 12)
             )
             
-            city_data['price_to_rent_ratio'] = city_data['price'] / (city_data['monthly_rent'] * 12)
-            
             # Calculate average price-to-rent by neighborhood
             ptr_by_neighborhood = city_data.groupby('neighborhood')['price_to_rent_ratio'].mean().reset_index()
             ptr_by_neighborhood = ptr_by_neighborhood.sort_values('price_to_rent_ratio')
@@ -93,19 +93,35 @@ def plot_price_distribution(df):
         fig.add_annotation(text="No data available", showarrow=False)
         return fig
     
-    fig = px.histogram(
-        df,
-        x='price',
-        nbins=20,
-        color='property_type',
+    # Bin prices server-side so only the bin counts are sent to the browser
+    prices = df['price'].dropna()
+    bin_edges = np.histogram_bin_edges(prices, bins=20)
+    bin_centers = (bin_edges[:-1] + bin_edges[1:]) / 2
+    bin_widths = np.diff(bin_edges)
+    
+    fig = go.Figure()
+    for property_type, type_prices in prices.groupby(df['property_type'], observed=True, sort=False):
+        counts, _ = np.histogram(type_prices, bins=bin_edges)
+        fig.add_trace(
+            go.Bar(
+                x=bin_centers,
+                y=counts,
+                width=bin_widths,
+                name=str(property_type),
+                opacity=0.7,
+                hovertemplate='Price ($): %{x:,.0f}<br>Number of Properties: %{y}'
+            )
+        )
+    
+    fig.update_layout(
         title='Price Distribution by Property Type',
         template='plotly_white',
-        labels={'price': 'Price ($)', 'property_type': 'Property Type'},
-        opacity=0.7
+        barmode='relative',
+        legend_title_text='Property Type'
     )
     
     # Add median line
-    median_price = df['price'].median()
+    median_price = prices.median()
     fig.add_vline(
         x=median_price,
         line_dash='dash',
@@ -143,7 +159,8 @@ def plot_price_vs_sqft(df):
         template='plotly_white',
         labels={'sqft': 'Square Footage', 'price': 'Price ($)', 'property_type': 'Property Type'},
         opacity=0.7,
-        hover_data=['address', 'city', 'bedrooms', 'bathrooms']
+        hover_data=['address', 'city', 'bedrooms', 'bathrooms'],
+        render_mode='webgl'
     )
     
     # Add trendline